@@ -0,0 +1,81 @@
+import time
+from http import HTTPStatus
+
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Comment, Group, Post
+from posts.tests.fixtures import FixturesTestCase
+
+
+class ApiTests(FixturesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.group = Group.objects.create(title='Группа API', slug='api')
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Пост для API'
+        )
+
+    def test_endpoints_mirror_html_views(self):
+        urls = {
+            reverse('api:index'): 'posts',
+            reverse('api:group_posts', args=(self.group.slug,)): 'group',
+            reverse('api:profile', args=(self.user.username,)): 'author',
+            reverse('api:post_detail', args=(self.post.id,)): 'comments',
+        }
+        for url, key in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIn(key, response.json())
+                self.assertIn('ETag', response)
+                self.assertNotIn('Last-Modified', response)
+        data = self.client.get(reverse('api:index')).json()
+        self.assertEqual(data['posts']['results'][0]['text'], 'Пост для API')
+
+    def test_cursor_pagination(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}') for i in range(12)
+        )
+        data = self.client.get(reverse('api:index')).json()['posts']
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+        second = self.client.get(data['next']).json()['posts']
+        self.assertEqual(len(second['results']), 4)
+        self.assertIsNone(second['next'])
+
+    def test_unchanged_feed_returns_not_modified(self):
+        url = reverse('api:post_detail', args=(self.post.id,))
+        response = self.client.get(url)
+        etag = response['ETag']
+        not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b'')
+        Comment.objects.create(post=self.post, author=self.user, text='Новый')
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, HTTPStatus.OK)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_edit_and_author_rename_change_etag(self):
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        edited = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(edited.status_code, HTTPStatus.OK)
+        self.user.first_name = 'Переименован'
+        self.user.save()
+        renamed = self.client.get(url, HTTP_IF_NONE_MATCH=edited['ETag'])
+        self.assertEqual(renamed.status_code, HTTPStatus.OK)
+
+    def test_deletion_is_not_hidden_by_if_modified_since(self):
+        url = reverse('api:index')
+        response = self.client.get(url)
+        Post.objects.filter(id=self.post.id).delete()
+        since = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+        )
+        self.assertEqual(since.status_code, HTTPStatus.OK)
+        deleted = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(deleted.status_code, HTTPStatus.OK)
+        self.assertNotContains(deleted, 'Пост для API')
@@ -0,0 +1,162 @@
+import hashlib
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core.routers import read_from_replica
+from core.versions import version_key
+from posts.fragments import (group_cache, index_cache, post_scopes,
+                             profile_cache)
+from posts.models import Group, Post, User
+from posts.views import POSTS_SHOWN_AMOUNT, paginate, paginate_comments
+
+
+def user_data(user):
+    return {
+        'username': user.username,
+        'full_name': user.get_full_name(),
+        'url': reverse('api:profile', args=(user.username,)),
+    }
+
+
+def group_data(group):
+    if group is None:
+        return None
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'url': reverse('api:group_posts', args=(group.slug,)),
+    }
+
+
+def post_data(post):
+    return {
+        'id': post.id,
+        'url': reverse('api:post_detail', args=(post.id,)),
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'updated': post.updated.isoformat(),
+        'author': user_data(post.author),
+        'group': group_data(post.group),
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def comment_data(comment):
+    return {
+        'id': comment.id,
+        'author': user_data(comment.author),
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def cursor_link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def page_data(request, page, serialize):
+    return {
+        'results': [serialize(obj) for obj in page],
+        'next': cursor_link(request, page.next_cursor),
+        'previous': cursor_link(request, page.previous_cursor),
+    }
+
+
+def entity_tag(version, posts, comments):
+    """ETag по постам и комментариям выдачи. version меняется при правке
+    авторов и групп, которые попадают в ответ, и при удалении постов.
+    Last-Modified не отдаётся: дата самой свежей записи не меняется ни
+    при удалении, ни при переименовании, и клиент с одним
+    If-Modified-Since получил бы 304 на изменившийся ответ."""
+    parts = [version]
+    parts.extend(
+        f'{post.id}:{post.updated.timestamp()}:{post.comments_count}'
+        for post in posts
+    )
+    parts.extend(str(comment.id) for comment in comments)
+    return quote_etag(hashlib.md5('|'.join(parts).encode()).hexdigest())
+
+
+def conditional_json(request, version, posts, build, comments=()):
+    # Если клиент прислал актуальный ETag, ответ не сериализуется.
+    etag = entity_tag(version, list(posts), list(comments))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(
+            build(), json_dumps_params={'ensure_ascii': False}
+        )
+    response['ETag'] = etag
+    return response
+
+
+def feed_response(request, page, version, **extra):
+    def build():
+        return {**extra, 'posts': page_data(request, page, post_data)}
+    cursors = [page.next_cursor or '', page.previous_cursor or '']
+    return conditional_json(
+        request, ':'.join([version, *cursors]), page, build
+    )
+
+
+@read_from_replica
+def index(request):
+    posts = Post.objects.select_related('author', 'group')
+    page = paginate(request, posts, POSTS_SHOWN_AMOUNT, windowed=False)
+    return feed_response(request, page, index_cache().version)
+
+
+@read_from_replica
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    posts = group.posts.select_related('author', 'group')
+    page = paginate(request, posts, POSTS_SHOWN_AMOUNT, windowed=False)
+    return feed_response(
+        request, page, group_cache(group).version, group=group_data(group)
+    )
+
+
+@read_from_replica
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.select_related('author', 'group')
+    page = paginate(request, posts, POSTS_SHOWN_AMOUNT, windowed=False)
+    stats = getattr(author, 'stats', None)
+    return feed_response(
+        request, page, profile_cache(author).version,
+        author={
+            **user_data(author),
+            'posts_count': stats.posts_count if stats else 0,
+            'followers_count': stats.followers_count if stats else 0,
+            'following_count': stats.following_count if stats else 0,
+        }
+    )
+
+
+@read_from_replica
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
+    comments = paginate_comments(request, post.id)
+
+    def build():
+        return {
+            **post_data(post),
+            'comments': page_data(request, comments, comment_data),
+        }
+    cursors = [comments.next_cursor or '', comments.previous_cursor or '']
+    return conditional_json(
+        request, ':'.join([version_key(*post_scopes(post)), *cursors]),
+        [post], build, comments=comments
+    )
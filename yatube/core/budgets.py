@@ -0,0 +1,181 @@
+import logging
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_init
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+OFF, LOG, RAISE = 'off', 'log', 'raise'
+
+_current = ContextVar('query_budget', default=None)
+
+# Отправляется после каждой проверки бюджета: тесты по нему узнают,
+# сколько запросов и строк view потратила на самом деле.
+budget_checked = Signal(providing_args=['budget', 'usage'])
+
+
+class BudgetExceeded(AssertionError):
+    pass
+
+
+class Budget:
+    def __init__(self, queries=None, rows=None):
+        self.queries = queries
+        self.rows = rows
+
+
+class Usage:
+    """SQL-запросы и созданные из строк выборки модели за время view."""
+
+    def __init__(self):
+        self.statements = []
+        self.rows = 0
+
+    @property
+    def queries(self):
+        return len(self.statements)
+
+    def violations(self, budget):
+        problems = []
+        if budget.queries is not None and self.queries > budget.queries:
+            problems.append(f'запросов {self.queries} > {budget.queries}')
+        if budget.rows is not None and self.rows > budget.rows:
+            problems.append(f'строк {self.rows} > {budget.rows}')
+        return problems
+
+    def report(self, name, problems):
+        lines = [f'{name}: превышен бюджет ({", ".join(problems)})']
+        lines.extend(
+            f'{number}. {_format_sql(sql, params)}'
+            for number, (sql, params) in enumerate(self.statements, 1)
+        )
+        return '\n'.join(lines)
+
+
+def _format_sql(sql, params):
+    if not params:
+        return sql
+    try:
+        return sql % tuple(repr(param) for param in params)
+    except (TypeError, ValueError):
+        return f'{sql} {params!r}'
+
+
+def _record_query(execute, sql, params, many, context):
+    usage = _current.get()
+    if usage is not None:
+        usage.statements.append((sql, None if many else params))
+    return execute(sql, params, many, context)
+
+
+def _count_row(sender, instance, **kwargs):
+    # post_init отправляется и для объектов, созданных в коде, но их во
+    # view единицы; основная масса — строки, загруженные из базы.
+    usage = _current.get()
+    if usage is not None:
+        usage.rows += 1
+
+
+post_init.connect(_count_row, dispatch_uid='core.budgets.count_rows')
+
+
+@contextmanager
+def tracking(usage):
+    token = _current.set(usage)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(_record_query)
+                )
+            yield usage
+    finally:
+        _current.reset(token)
+
+
+def track_usage():
+    return tracking(Usage())
+
+
+class TrackedStream:
+    """Итератор потокового ответа: запросы, которые выполняются при его
+    отдаче (выгрузки), идут в тот же Usage, а бюджет проверяется, когда
+    ответ отдан или закрыт."""
+
+    def __init__(self, chunks, usage, finish):
+        self.chunks = iter(chunks)
+        self.usage = usage
+        self.finish = finish
+        self.finished = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with tracking(self.usage):
+            try:
+                return next(self.chunks)
+            except StopIteration:
+                self.close()
+                raise
+
+    def close(self):
+        if not self.finished:
+            self.finished = True
+            self.finish()
+
+
+@contextmanager
+def untracked():
+    """Работа, которая в продакшене идёт вне запроса (фоновые задачи в
+    eager-режиме), в бюджет view не засчитывается."""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def check(name, budget, usage, mode):
+    budget_checked.send(sender=name, budget=budget, usage=usage)
+    problems = usage.violations(budget)
+    if not problems:
+        return
+    message = usage.report(name, problems)
+    if mode == RAISE:
+        raise BudgetExceeded(message)
+    logger.warning(message)
+
+
+def query_budget(queries=None, rows=None):
+    """Объявляет для view предельное число SQL-запросов и загруженных
+    моделей. Нарушение пишется в лог или, в режиме raise, роняет запрос.
+    У потокового ответа в бюджет входит и его отдача."""
+    budget = Budget(queries, rows)
+
+    def decorator(view):
+        name = f'{view.__module__}.{view.__name__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            mode = settings.QUERY_BUDGET_MODE
+            if mode == OFF:
+                return view(request, *args, **kwargs)
+            with track_usage() as usage:
+                response = view(request, *args, **kwargs)
+            if response.streaming:
+                response.streaming_content = TrackedStream(
+                    response.streaming_content, usage,
+                    partial(check, name, budget, usage, mode)
+                )
+            else:
+                check(name, budget, usage, mode)
+            return response
+        wrapper.query_budget = budget
+        return wrapper
+    return decorator
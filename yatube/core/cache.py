@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import MemcachedCache, PyLibMCCache
+
+from .metrics import record_cache_lookup
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """Считает попадания и промахи get(). get_many базового класса
+    тоже идёт через get()."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        record_cache_lookup(value is not _missing)
+        return default if value is _missing else value
+
+
+class InstrumentedMemcachedMixin(InstrumentedCacheMixin):
+    # У memcached свой get_many, одним запросом к серверу.
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        for key in keys:
+            record_cache_lookup(key in found)
+        return found
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedMemcachedCache(InstrumentedMemcachedMixin, MemcachedCache):
+    pass
+
+
+class InstrumentedPyLibMCCache(InstrumentedMemcachedMixin, PyLibMCCache):
+    pass
+
+
+def is_process_local(alias='default'):
+    """LocMem виден только своему процессу: сброс версии, сессии или
+    графа подписок в одном воркере не доходит до остальных."""
+    return isinstance(caches[alias], LocMemCache)
+
+
+def is_shared(alias='default'):
+    """Запись в кэше видят все процессы сайта: кэш общий или процесс
+    один (SINGLE_PROCESS)."""
+    return settings.SINGLE_PROCESS or not is_process_local(alias)
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+from .cache import is_shared
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Версии фрагментов (core.versions) и всё, что на них опирается,
+    корректны только в кэше, общем для веб-воркеров и process_tasks."""
+    if is_shared():
+        return []
+    return [Error(
+        'Кэш default локален для процесса.',
+        hint=(
+            'Задайте CACHE_BACKEND с общим кэшем (например, '
+            'core.cache.InstrumentedPyLibMCCache) и CACHE_LOCATION или, '
+            'если сайт и задачи обслуживает один процесс, SINGLE_PROCESS.'
+        ),
+        id='core.E001',
+    )]
+
+
+@register(deploy=True)
+def check_metrics_dir(app_configs, **kwargs):
+    """Без общего каталога /metrics показывает счётчики одного процесса."""
+    if settings.SINGLE_PROCESS or settings.METRICS_DIR:
+        return []
+    return [Warning(
+        'METRICS_DIR не задан: метрики каждого процесса видны только ему.',
+        hint='Задайте METRICS_DIR — каталог, общий для всех процессов.',
+        id='core.W001',
+    )]
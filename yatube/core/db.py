@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def analyze(connection):
+    """Обновляет статистику планировщика: по ней table_estimate оценивает
+    размер таблиц без COUNT(*)."""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    # Настройки действуют на соединение, поэтому выставляются при каждом
+    # подключении; при CONN_MAX_AGE это происходит редко.
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS', settings.SQLITE_PRAGMAS)
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import analyze
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет статистику планировщика, по которой админка и ленты '
+        'оценивают число записей (запускать по расписанию и после импорта)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Псевдоним базы (по умолчанию default)'
+        )
+
+    def handle(self, *args, **options):
+        analyze(connections[options['database']])
+        self.stdout.write('Статистика обновлена')
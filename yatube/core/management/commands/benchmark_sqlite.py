@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+
+# default повторяет поведение Django без настроек: журнал отката и
+# пятисекундный таймаут модуля sqlite3.
+PROFILES = {
+    'default': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'tuned': None,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет пропускную способность чтения SQLite при параллельной '
+        'записи: стандартный журнал против настроек SQLITE_PRAGMAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Строк в тестовой таблице перед началом замера'
+        )
+
+    def handle(self, *args, **options):
+        seconds = options['seconds']
+        for name, pragmas in PROFILES.items():
+            result = self.run_profile(
+                pragmas or settings.SQLITE_PRAGMAS, options
+            )
+            self.stdout.write(
+                f'{name}: чтений {result["reads"] / seconds:.0f}/с, '
+                f'записей {result["writes"] / seconds:.0f}/с, '
+                f'ошибок блокировки {result["busy"]}'
+            )
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(
+            path, timeout=5, isolation_level=None, check_same_thread=False
+        )
+        apply_pragmas(connection, pragmas)
+        return connection
+
+    def run_profile(self, pragmas, options):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'benchmark.sqlite3')
+        setup = self.connect(path, pragmas)
+        setup.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, author INTEGER, '
+            'text TEXT, pub_date REAL)'
+        )
+        setup.execute('CREATE INDEX post_author ON post (author, pub_date)')
+        setup.executemany(
+            'INSERT INTO post (author, text, pub_date) VALUES (?, ?, ?)',
+            ((i % 100, 'x' * 200, time.time()) for i in range(options['rows']))
+        )
+        setup.close()
+
+        counters = {'reads': 0, 'writes': 0, 'busy': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def count(name):
+            with lock:
+                counters[name] += 1
+
+        def reader(number):
+            connection = self.connect(path, pragmas)
+            while time.monotonic() < deadline:
+                try:
+                    connection.execute(
+                        'SELECT id, text FROM post WHERE author = ? '
+                        'ORDER BY pub_date DESC LIMIT 10', (number % 100,)
+                    ).fetchall()
+                    count('reads')
+                except sqlite3.OperationalError:
+                    count('busy')
+            connection.close()
+
+        def writer(number):
+            connection = self.connect(path, pragmas)
+            while time.monotonic() < deadline:
+                try:
+                    connection.execute(
+                        'INSERT INTO post (author, text, pub_date) '
+                        'VALUES (?, ?, ?)', (number, 'y' * 200, time.time())
+                    )
+                    count('writes')
+                except sqlite3.OperationalError:
+                    count('busy')
+            connection.close()
+
+        threads = [
+            threading.Thread(target=reader, args=(i,))
+            for i in range(options['readers'])
+        ] + [
+            threading.Thread(target=writer, args=(i,))
+            for i in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+        return counters
@@ -0,0 +1,303 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_lock = threading.Lock()
+_current = ContextVar('request_metrics', default=None)
+_flushed = 0.0
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, labels, amount=1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    @staticmethod
+    def merge(values, labels, value):
+        values[labels] = values.get(labels, 0) + value
+
+    def samples(self, values):
+        for labels, value in sorted(values.items()):
+            yield self.name + _format_labels(self.labels, labels), value
+
+
+class Histogram(Counter):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels, buckets):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            counts, total = self.values.get(
+                labels, ([0] * (len(self.buckets) + 1), 0)
+            )
+            counts[index] += 1
+            self.values[labels] = (counts, total + value)
+
+    @staticmethod
+    def merge(values, labels, value):
+        counts, total = value
+        if labels in values:
+            merged, merged_total = values[labels]
+            counts = [a + b for a, b in zip(merged, counts)]
+            total += merged_total
+        values[labels] = (list(counts), total)
+
+    def samples(self, values):
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            bounds = [*self.buckets, '+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                yield self.name + '_bucket' + _format_labels(
+                    self.labels, labels, f'le="{bound}"'
+                ), cumulative
+            suffix = _format_labels(self.labels, labels)
+            yield f'{self.name}_sum{suffix}', total
+            yield f'{self.name}_count{suffix}', cumulative
+
+
+REQUESTS = Counter(
+    'yatube_requests_total', 'Запросы по view и статусу',
+    ('view', 'method', 'status')
+)
+REQUEST_DURATION = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа',
+    ('view', 'method'), LATENCY_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'yatube_db_queries', 'Число SQL-запросов на запрос',
+    ('view',), QUERY_BUCKETS
+)
+DB_DURATION = Histogram(
+    'yatube_db_duration_seconds', 'Время SQL-запросов на запрос',
+    ('view',), LATENCY_BUCKETS
+)
+TEMPLATE_DURATION = Histogram(
+    'yatube_template_render_seconds', 'Время рендера шаблонов на запрос',
+    ('view',), LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    'yatube_cache_lookups_total', 'Чтения из кэша по результату',
+    ('view', 'result')
+)
+METRICS = (
+    REQUESTS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, TEMPLATE_DURATION,
+    CACHE_LOOKUPS,
+)
+
+
+class RequestMetrics:
+    __slots__ = (
+        'queries', 'db_time', 'template_time', 'template_depth',
+        'cache_hits', 'cache_misses',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def start_request():
+    return _current.set(RequestMetrics())
+
+
+def detach(token):
+    """Снимает метрики запроса с контекста и возвращает их: ответ, который
+    отдаётся потоком, продолжает их копить в resumed()."""
+    current = _current.get()
+    _current.reset(token)
+    return current
+
+
+@contextmanager
+def resumed(current):
+    token = _current.set(current)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def record_request(current, view, method, status, duration):
+    REQUESTS.inc((view, method, status))
+    REQUEST_DURATION.observe((view, method), duration)
+    DB_QUERIES.observe((view,), current.queries)
+    DB_DURATION.observe((view,), current.db_time)
+    TEMPLATE_DURATION.observe((view,), current.template_time)
+    if current.cache_hits:
+        CACHE_LOOKUPS.inc((view, 'hit'), current.cache_hits)
+    if current.cache_misses:
+        CACHE_LOOKUPS.inc((view, 'miss'), current.cache_misses)
+    flush()
+
+
+def finish_request(token, view, method, status, duration):
+    record_request(detach(token), view, method, status, duration)
+
+
+def time_query(execute, sql, params, many, context):
+    """execute_wrapper для всех соединений на время запроса."""
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.queries += 1
+        current.db_time += time.perf_counter() - started
+
+
+@contextmanager
+def time_template():
+    # Вложенный render_to_string (карточки постов) уже входит во время
+    # внешнего шаблона и отдельно не считается.
+    current = _current.get()
+    if current is None:
+        yield
+        return
+    current.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.template_depth -= 1
+        if not current.template_depth:
+            current.template_time += time.perf_counter() - started
+
+
+def record_cache_lookup(hit):
+    current = _current.get()
+    if current is None:
+        return
+    if hit:
+        current.cache_hits += 1
+    else:
+        current.cache_misses += 1
+
+
+def _snapshot_path():
+    return os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+
+
+def flush(force=False):
+    """Записывает значения процесса в METRICS_DIR, не чаще раза в
+    METRICS_FLUSH_INTERVAL. Каждый процесс пишет только свой файл, поэтому
+    блокировки между процессами не нужны."""
+    global _flushed
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _flushed < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _flushed = now
+    with _lock:
+        snapshot = {
+            metric.name: [
+                [list(labels), value]
+                for labels, value in metric.values.items()
+            ]
+            for metric in METRICS
+        }
+    path = _snapshot_path()
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as target:
+        json.dump(snapshot, target)
+    os.replace(temporary, path)
+
+
+def collect():
+    """{имя метрики: значения}. С METRICS_DIR — сумма снимков всех
+    процессов (веб-воркеров и process_tasks), иначе только этого."""
+    if not settings.METRICS_DIR:
+        with _lock:
+            return {metric.name: dict(metric.values) for metric in METRICS}
+    flush(force=True)
+    totals = {metric.name: {} for metric in METRICS}
+    for name in os.listdir(settings.METRICS_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(
+                os.path.join(settings.METRICS_DIR, name), encoding='utf-8'
+            ) as source:
+                snapshot = json.load(source)
+        except (OSError, ValueError):
+            continue
+        for metric in METRICS:
+            for labels, value in snapshot.get(metric.name, ()):
+                metric.merge(totals[metric.name], tuple(labels), value)
+    return totals
+
+
+def render_metrics():
+    values = collect()
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(
+            f'{name} {value}'
+            for name, value in metric.samples(values[metric.name])
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def _clear():
+    with _lock:
+        for metric in METRICS:
+            metric.values.clear()
+
+
+def reset_metrics():
+    _clear()
+    if settings.METRICS_DIR and os.path.exists(_snapshot_path()):
+        os.remove(_snapshot_path())
+
+
+# Дочерний процесс (воркер с fork) начинает с нуля: значения родителя
+# уже лежат в его файле и иначе посчитались бы дважды.
+os.register_at_fork(after_in_child=_clear)
@@ -0,0 +1,196 @@
+import hashlib
+import time
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from . import metrics, routers
+from .versions import get_versions
+
+PAGE_KEY = 'page:{}'
+CACHE_HEADER = 'X-Page-Cache'
+
+
+def page_cache(tags):
+    """Разрешает кэшировать страницы view для анонимов. tags(request,
+    *args, **kwargs) возвращает теги страницы или None, если кэшировать
+    нечего (например, объекта нет)."""
+    def decorator(view):
+        view.page_cache_tags = tags
+        return view
+    return decorator
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэширует целые страницы для анонимных читателей. Запись хранит
+    версии своих тегов и считается устаревшей, как только любой тег
+    (пост, автор, группа) сменил версию. Версии читаются до вызова view:
+    правка, пришедшая во время рендера, оставит запись устаревшей, а не
+    сохранит старую страницу под новой версией."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_cacheable_request(request):
+            return self.get_response(request)
+        key = self.cache_key(request)
+        entry = cache.get(key)
+        if entry and entry['tags'] == get_versions(entry['tags']):
+            response = HttpResponse(entry['content'], status=entry['status'])
+            for header, value in entry['headers']:
+                response[header] = value
+            response[CACHE_HEADER] = 'HIT'
+            return response
+        tags = self.page_tags(request)
+        versions = get_versions(tags) if tags else None
+        # Страница для кэша строится по основной базе: отставшая реплика
+        # сохранила бы старые данные под текущими версиями.
+        with routers.primary_reads() if versions else nullcontext():
+            response = self.get_response(request)
+        if versions and self.is_cacheable_response(request, response):
+            cache.set(key, {
+                'tags': versions,
+                'content': response.content,
+                'status': response.status_code,
+                'headers': list(response.items()),
+            }, settings.PAGE_CACHE_TIMEOUT)
+        response[CACHE_HEADER] = 'MISS'
+        return response
+
+    def cache_key(self, request):
+        location = f'{request.get_host()}{request.get_full_path()}'
+        return PAGE_KEY.format(hashlib.md5(location.encode()).hexdigest())
+
+    def page_tags(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        tags = getattr(match.func, 'page_cache_tags', None)
+        if tags is None:
+            return None
+        return tags(request, *match.args, **match.kwargs)
+
+    def is_cacheable_request(self, request):
+        return (
+            request.method == 'GET'
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        )
+
+    def is_cacheable_response(self, request, response):
+        return bool(
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+            and not request.user.is_authenticated
+        )
+
+
+class PrimaryStickinessMiddleware:
+    """После запроса, который что-то записал, ставит куку: пока она жива,
+    чтение идёт с основной базы и пользователь видит свои изменения."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = routers.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.finish_request(token)
+        if wrote:
+            response.set_cookie(
+                routers.STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+
+@contextmanager
+def timed_queries():
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(metrics.time_query)
+            )
+        yield
+
+
+class MeteredStream:
+    """Итератор потокового ответа: запросы, которые выполняются уже при
+    отдаче (выгрузки), засчитываются его view. Запрос записывается в
+    метрики, когда сервер закрывает ответ."""
+
+    def __init__(self, chunks, current, finish):
+        self.chunks = iter(chunks)
+        self.current = current
+        self.finish = finish
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with metrics.resumed(self.current), timed_queries():
+            return next(self.chunks)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.finish(self.current)
+
+
+class MetricsMiddleware:
+    """Собирает по каждому view время ответа, число и время SQL-запросов,
+    время рендера шаблонов и обращения к кэшу."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = metrics.start_request()
+        started = time.perf_counter()
+        response = None
+        try:
+            with timed_queries():
+                response = self.get_response(request)
+        finally:
+            current = metrics.detach(token)
+            if response is None or not response.streaming:
+                self.record(request, response, started, current)
+        if response.streaming:
+            response.streaming_content = MeteredStream(
+                response.streaming_content, current,
+                partial(self.record, request, response, started)
+            )
+        return response
+
+    def record(self, request, response, started, current):
+        metrics.record_request(
+            current,
+            self.view_name(request),
+            request.method,
+            500 if response is None else response.status_code,
+            time.perf_counter() - started
+        )
+
+    @staticmethod
+    def view_name(request):
+        # Ответы из кэша страниц отдаются до разрешения URL.
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                return 'unmatched'
+        return match.view_name
@@ -0,0 +1,433 @@
+import base64
+import binascii
+import json
+import math
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+FORWARD = 'n'
+BACKWARD = 'p'
+LAST = 'l'
+
+ESTIMATED_COUNT_KEY = 'estimated-count:{}'
+
+# Ссылка на страницу; cursor=None — пропуск «…» между ссылками.
+PageLink = namedtuple('PageLink', ('number', 'cursor', 'current'))
+GAP = PageLink(None, None, False)
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def table_estimate(model, using='default'):
+    """Число строк таблицы по статистике планировщика, без COUNT(*).
+    Возвращает None, если статистики нет."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [table]
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [table]
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    estimate = int(float(str(row[0]).split()[0]))
+    return estimate if estimate > 0 else None
+
+
+def estimated_count(queryset, limit=None):
+    """Приблизительное число записей: для всей таблицы берётся из
+    статистики, иначе считается не дальше limit строк."""
+    if limit is None:
+        limit = settings.ESTIMATED_COUNT_LIMIT
+    query = queryset.query
+    if not query.where and not query.distinct and not query.combinator:
+        estimate = table_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > limit:
+            return estimate
+    return queryset.order_by().values('pk')[:limit + 1].count()
+
+
+def cached_table_estimate(model):
+    """table_estimate, закэшированный на ESTIMATED_COUNT_TIMEOUT: для
+    номера последней страницы точность до минут не нужна. None, если
+    статистики нет: ограниченный COUNT упёрся бы в ESTIMATED_COUNT_LIMIT,
+    и последняя страница получила бы номер по пределу, а не по таблице."""
+    key = ESTIMATED_COUNT_KEY.format(model._meta.label_lower)
+    count = cache.get(key)
+    if count is None:
+        # 0 — «оценки нет»: None кэш не отличил бы от промаха.
+        count = table_estimate(model) or 0
+        cache.set(key, count, settings.ESTIMATED_COUNT_TIMEOUT)
+    return count or None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который не делает точный COUNT(*) по большим таблицам.
+    approximate — число записей оценено, а не посчитано."""
+    approximate = False
+
+    @cached_property
+    def count(self):
+        count = estimated_count(self.object_list)
+        self.approximate = count > settings.ESTIMATED_COUNT_LIMIT
+        return count
+
+
+class CursorPaginator:
+    """Keyset-пагинатор: страницы отсчитываются от ключа последней записи,
+    а не от OFFSET, поэтому стоимость выборки не зависит от глубины."""
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 count=None, windowed=True):
+        """count — число записей или функция, которая его вернёт (обычно
+        хранимый счётчик или оценка): по нему нумеруется последняя
+        страница. Точный COUNT(*) пагинатор не делает никогда.
+        windowed=False — без нумерованных ссылок (API, «показать ещё»):
+        страница не добирает записи для окна ссылок."""
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.key_names = tuple(key.lstrip('-') for key in self.ordering)
+        self._count = count
+        self.windowed = windowed
+
+    @cached_property
+    def count(self):
+        return self._count() if callable(self._count) else self._count
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(math.ceil(self.count / self.per_page), 1)
+
+    @cached_property
+    def last_page_size(self):
+        """Последняя страница — остаток от count, как при листании
+        вперёд: иначе она повторяла бы записи предыдущей под своим
+        номером. Без count — полная страница с конца."""
+        if not self.count:
+            return self.per_page
+        return self.count % self.per_page or self.per_page
+
+    @property
+    def max_skip(self):
+        return settings.PAGINATION_WINDOW * self.per_page
+
+    def encode_cursor(self, direction, values, number=None, skip=0):
+        """skip — сколько записей пропустить от ключа: так ссылка окна
+        ведёт на страницу, ключи которой не выбирались."""
+        payload = [direction]
+        if values is not None or number is not None or skip:
+            payload.append(None if values is None else [
+                value.isoformat() if hasattr(value, 'isoformat') else value
+                for value in values
+            ])
+        if number is not None or skip:
+            payload.append(number)
+        if skip:
+            payload.append(skip)
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает направление, ключ, номер страницы (None, если курсор
+        выдан без номера) и число пропускаемых записей."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw.decode())
+            direction = payload[0]
+            number = payload[2] if len(payload) > 2 else None
+            if number is not None and (
+                not isinstance(number, int) or number < 1
+            ):
+                raise InvalidCursor(cursor)
+            skip = payload[3] if len(payload) > 3 else 0
+            # Пропуск не дальше окна ссылок: иначе курсор превратился бы в
+            # произвольный OFFSET.
+            if not isinstance(skip, int) or not 0 <= skip <= self.max_skip:
+                raise InvalidCursor(cursor)
+            if direction == LAST and not skip:
+                return direction, None, number, 0
+            if direction not in (FORWARD, BACKWARD):
+                raise InvalidCursor(cursor)
+            values = payload[1]
+            if len(values) != len(self.key_names):
+                raise InvalidCursor(cursor)
+            return direction, tuple(
+                self.parse_key(name, value)
+                for name, value in zip(self.key_names, values)
+            ), number, skip
+        except (binascii.Error, ValueError, TypeError, IndexError,
+                UnicodeDecodeError, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def parse_key(self, name, value):
+        return self.object_list.model._meta.get_field(name).to_python(value)
+
+    def key_values(self, obj):
+        return tuple(getattr(obj, name) for name in self.key_names)
+
+    def _seek(self, ordering, values):
+        # a <= x AND (a < x OR rest) вместо (a < x) OR (a = x AND rest):
+        # так ведущий ключ остаётся диапазоном и используется индекс.
+        key, *rest = ordering
+        name = key.lstrip('-')
+        op = 'lt' if key.startswith('-') else 'gt'
+        strict = Q(**{f'{name}__{op}': values[0]})
+        if not rest:
+            return strict
+        return (
+            Q(**{f'{name}__{op}e': values[0]})
+            & (strict | self._seek(rest, values[1:]))
+        )
+
+    def _reversed_ordering(self):
+        return tuple(
+            key[1:] if key.startswith('-') else f'-{key}'
+            for key in self.ordering
+        )
+
+    def _ordered(self, direction, values):
+        if direction in (BACKWARD, LAST):
+            ordering = self._reversed_ordering()
+        else:
+            ordering = self.ordering
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(ordering, values))
+        return queryset
+
+    def fetch(self, direction, values, limit, offset=0):
+        return list(self._ordered(direction, values)[offset:offset + limit])
+
+    def page(self, cursor=None):
+        direction, values, number, skip = FORWARD, None, 1, 0
+        if cursor:
+            direction, values, number, skip = self.decode_cursor(cursor)
+        if direction == LAST and number is None:
+            number = self.num_pages
+        return CursorPage(
+            self, direction, values, cursor or '', number, skip
+        )
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page()
+
+
+class CursorPage:
+    def __init__(self, paginator, direction, values, cursor, number=None,
+                 skip=0):
+        self.paginator = paginator
+        self.direction = direction
+        self.values = values
+        self.cursor = cursor
+        self.number = number
+        self.skip = skip
+
+    def __repr__(self):
+        return f'<CursorPage {self.cursor or "first"}>'
+
+    @cached_property
+    def _window(self):
+        """Записи страницы, наличие соседних и записи за ней в сторону
+        выборки, от ближней. Для нумерованных ссылок тот же запрос
+        добирает PAGINATION_WINDOW страниц: ключи соседних страниц
+        берутся из него, а не из отдельных запросов."""
+        size = self.paginator.per_page
+        if self.direction == LAST:
+            size = self.paginator.last_page_size
+        extra = 1
+        if self.paginator.windowed and self.number is not None:
+            extra += self.paginator.max_skip
+        rows = self.paginator.fetch(
+            self.direction, self.values, size + extra, self.skip
+        )
+        rows, beyond = rows[:size], rows[size:]
+        if self.direction == FORWARD:
+            return rows, self.values is not None, bool(beyond), beyond
+        rows.reverse()
+        return rows, bool(beyond), self.direction == BACKWARD, beyond
+
+    @property
+    def object_list(self):
+        return self._window[0]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self._window[1]
+
+    def has_next(self):
+        return self._window[2]
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def _shifted(self, offset):
+        if self.number is None:
+            return None
+        return self.number + offset
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(
+            FORWARD, self.paginator.key_values(self.object_list[-1]),
+            self._shifted(1)
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        if not self.object_list:
+            return self.last_cursor
+        return self.paginator.encode_cursor(
+            BACKWARD, self.paginator.key_values(self.object_list[0]),
+            self._shifted(-1)
+        )
+
+    @property
+    def last_cursor(self):
+        return self.paginator.encode_cursor(
+            LAST, None, self.paginator.num_pages
+        )
+
+    def _beyond_keys(self):
+        return [self.paginator.key_values(row) for row in self._window[3]]
+
+    def _links_before(self, window):
+        number = self.number
+        links = [PageLink(number - 1, self.previous_cursor, False)]
+        if number - 1 == 1:
+            links[0] = PageLink(1, '', False)
+        # Курсор страницы number - 1 - step — ключ step * per_page-й записи
+        # перед текущей. Если страница выбрана назад, эти записи уже
+        # добраны; иначе ссылка пропускает их от первой записи страницы.
+        per_page = self.paginator.per_page
+        behind = None
+        if self.direction != FORWARD:
+            behind = self._beyond_keys()
+        for step in range(1, window):
+            target, skip = number - 1 - step, step * per_page
+            if target < 2 or not self.object_list:
+                break
+            if behind is None:
+                cursor = self.paginator.encode_cursor(
+                    BACKWARD, self.paginator.key_values(self.object_list[0]),
+                    target, skip
+                )
+            elif len(behind) >= skip:
+                cursor = self.paginator.encode_cursor(
+                    BACKWARD, behind[skip - 1], target
+                )
+            else:
+                break
+            links.insert(0, PageLink(target, cursor, False))
+        first = links[0].number
+        if first > 1:
+            links[:0] = [PageLink(1, '', False)] + (
+                [GAP] if first > 2 else []
+            )
+        return links
+
+    def _links_after(self, window):
+        number = self.number
+        links = [PageLink(number + 1, self.next_cursor, False)]
+        per_page = self.paginator.per_page
+        last = self.paginator.num_pages
+        if self.direction == FORWARD:
+            ahead = self._beyond_keys()
+            for step in range(1, window):
+                index = step * per_page - 1
+                if len(ahead) <= index + 1:
+                    return links
+                target = number + 1 + step
+                links.append(PageLink(
+                    target,
+                    self.paginator.encode_cursor(
+                        FORWARD, ahead[index], target
+                    ),
+                    False
+                ))
+            more = len(ahead) > window * per_page
+        elif last is not None:
+            # Записи после страницы, выбранной назад, не добирались:
+            # ссылки пропускают их от её последней записи, а сколько
+            # страниц впереди, известно только по count.
+            for step in range(1, window):
+                target = number + 1 + step
+                if target > last:
+                    return links
+                links.append(PageLink(
+                    target,
+                    self.paginator.encode_cursor(
+                        FORWARD,
+                        self.paginator.key_values(self.object_list[-1]),
+                        target, step * per_page
+                    ),
+                    False
+                ))
+            more = last > number + window
+        else:
+            more = True
+        if more:
+            # За окном есть ещё страницы: номер последней известен только
+            # при заданном count. Без него или с отставшим счётчиком
+            # ссылка остаётся без номера.
+            if last is not None and last < number + window + 1:
+                last = None
+            if last is None or last > number + window + 1:
+                links.append(GAP)
+            links.append(PageLink(last, self.last_cursor, False))
+        return links
+
+    @cached_property
+    def page_links(self):
+        """Первая, последняя и до PAGINATION_WINDOW страниц по обе
+        стороны от текущей. Пусто, если номер текущей страницы неизвестен
+        (курсор выдан без номера)."""
+        if self.number is None or not self.has_other_pages():
+            return []
+        window = settings.PAGINATION_WINDOW
+        links = [PageLink(self.number, self.cursor, True)]
+        if self.has_previous():
+            links[:0] = self._links_before(window)
+        if self.has_next():
+            links.extend(self._links_after(window))
+        return links
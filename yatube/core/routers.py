@@ -0,0 +1,88 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = 'primary_pin'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_wrote = ContextVar('wrote', default=False)
+_pinned = ContextVar('pinned', default=False)
+
+# Сессии и пользователь запроса читаются только с основной базы: иначе
+# выход, смена пароля или блокировка отставали бы на реплике.
+PRIMARY_APPS = {'sessions'}
+
+
+def start_request():
+    return _wrote.set(False)
+
+
+def finish_request(token):
+    wrote = _wrote.get()
+    _wrote.reset(token)
+    return wrote
+
+
+def read_from_replica(view):
+    """Разрешает view читать с реплик, если пользователь недавно ничего
+    не записывал (иначе он мог бы не увидеть свою правку)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if STICKY_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Внутри блока чтение идёт с основной базы даже в read_from_replica."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def reading_from_replica():
+    """Уходит ли сейчас чтение на реплику. Данные реплики могут отставать
+    от версий в кэше, поэтому построенное по ним в кэш не сохраняется."""
+    return bool(
+        settings.DATABASE_REPLICAS
+        and _replica_reads.get()
+        and not _pinned.get()
+        and not _wrote.get()
+        and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+    )
+
+
+class PrimaryReplicaRouter:
+    """Запись — всегда в default. Чтение — с реплики только внутри
+    read_from_replica, до первой записи, вне транзакции и вне
+    primary_reads."""
+
+    def db_for_read(self, model, **hints):
+        if (
+            model._meta.app_label not in PRIMARY_APPS
+            and reading_from_replica()
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,49 @@
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test import override_settings
+from django.urls import resolve
+
+from .budgets import RAISE, budget_checked
+
+
+class QueryBudgetMixin:
+    """Проверки бюджета запросов для TestCase: view должна объявить
+    query_budget и уложиться в него, иначе тест падает с её SQL."""
+
+    def assertWithinBudget(self, url, client=None, method='get', data=None):
+        return self.measure(url, client, method, data)[0]
+
+    def measure(self, url, client=None, method='get', data=None):
+        """Ответ и Usage, которым view отчиталась о бюджете (потоковый
+        ответ для этого читается целиком)."""
+        view = resolve(urlsplit(url).path).func
+        self.assertTrue(
+            hasattr(view, 'query_budget'),
+            f'Для {url} не объявлен query_budget'
+        )
+        client = client or self.client
+        reports = []
+
+        def receiver(sender, usage, **kwargs):
+            reports.append(usage)
+        budget_checked.connect(receiver)
+        try:
+            with override_settings(QUERY_BUDGET_MODE=RAISE):
+                response = getattr(client, method)(url, data or {})
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        finally:
+            budget_checked.disconnect(receiver)
+        self.assertEqual(len(reports), 1, f'{url}: бюджет не проверен')
+        return response, reports[0]
+
+
+def clear_statistics():
+    """Убирает статистику, собранную ANALYZE в тесте: она переживает откат
+    транзакции, и планы запросов следующих тестов строились бы по
+    статистике крошечных таблиц."""
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM sqlite_stat1')
+        # Перечитать статистику в планировщик.
+        cursor.execute('ANALYZE sqlite_master')
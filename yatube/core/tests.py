@@ -1,6 +1,28 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .budgets import BudgetExceeded, query_budget
+from .checks import check_shared_cache
+from .middleware import AnonymousPageCacheMiddleware
+from .metrics import reset_metrics
+from .routers import (STICKY_COOKIE, PrimaryReplicaRouter, finish_request,
+                      primary_reads, read_from_replica, start_request)
 
 
 class CoreTests(TestCase):
@@ -12,3 +34,261 @@ class CoreTests(TestCase):
             'core/404.html',
             'По пути /nonexist-page/ используется не правильный шаблон'
         )
+
+
+class SQLiteTuningTests(TestCase):
+    def test_pragmas_are_applied_to_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+
+    def test_connecting_does_not_analyze(self):
+        # ANALYZE на большой базе занял бы первый запрос или воркер целиком.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = connections['default'].__class__(
+            {
+                **connection.settings_dict,
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            },
+            alias='fresh'
+        )
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            self.assertIsNone(cursor.fetchone())
+
+    def test_contention_benchmark(self):
+        output = StringIO()
+        call_command(
+            'benchmark_sqlite', seconds=0.2, readers=1, writers=1, rows=10,
+            stdout=output
+        )
+        self.assertIn('default: чтений', output.getvalue())
+        self.assertIn('tuned: чтений', output.getvalue())
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    # Без транзакции TestCase: внутри неё чтение всегда идёт с default.
+    databases = {'default'}
+
+    def setUp(self):
+        self.model = get_user_model()
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        token = start_request()
+        self.addCleanup(finish_request, token)
+
+    def view(self, request):
+        @read_from_replica
+        def view(request):
+            return HttpResponse(self.router.db_for_read(self.model))
+        return view(request)
+
+    def route(self, request):
+        return self.view(request).content.decode()
+
+    def test_reads_go_to_replica_only_in_marked_views(self):
+        self.assertEqual(self.router.db_for_read(self.model), 'default')
+        self.assertEqual(self.route(self.factory.get('/')), 'replica1')
+        self.assertEqual(self.router.db_for_write(self.model), 'default')
+
+    def test_reads_after_write_and_in_transactions_use_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(self.route(request), 'default')
+        with transaction.atomic():
+            self.assertEqual(self.route(self.factory.get('/')), 'default')
+        self.router.db_for_write(self.model)
+        self.assertEqual(self.route(self.factory.get('/')), 'default')
+
+    def test_sessions_and_pinned_reads_use_primary(self):
+        with primary_reads():
+            self.assertEqual(self.route(self.factory.get('/')), 'default')
+        self.model = Session
+        self.assertEqual(self.route(self.factory.get('/')), 'default')
+
+    def test_page_cache_misses_render_from_primary(self):
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        middleware = AnonymousPageCacheMiddleware(self.view)
+        with mock.patch.object(
+            middleware, 'page_tags', return_value=['posts']
+        ):
+            response = middleware(request)
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(self.route(request), 'replica1')
+
+
+class ReplicaStickinessTests(TestCase):
+    def test_writes_pin_user_to_primary(self):
+        user = get_user_model().objects.create_user(username='writer')
+        self.client.force_login(user)
+        self.assertNotIn(STICKY_COOKIE, self.client.get('/').cookies)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свой пост'}
+        )
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_sync_replicas_copies_primary(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'replica.sqlite3')
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.remove, path)
+        call_command('sync_replicas', path, stdout=StringIO())
+        replica = sqlite3.connect(path)
+        tables = replica.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'posts_post'"
+        ).fetchall()
+        replica.close()
+        self.assertEqual(tables, [('posts_post',)])
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        reset_metrics()
+
+    def test_requests_are_measured_per_view(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn(
+            'yatube_requests_total{view="posts:index",method="GET",'
+            'status="200"} 2', text
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="posts:index",method="GET"} 2', text
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:index",le="+Inf"} 2', text
+        )
+        self.assertIn(
+            'yatube_template_render_seconds_count{view="posts:index"} 2', text
+        )
+        self.assertIn(
+            'yatube_cache_lookups_total{view="posts:index",result="hit"}',
+            text
+        )
+
+    def sample(self, name):
+        text = self.client.get(reverse('metrics')).content.decode()
+        for line in text.splitlines():
+            if line.startswith(name + ' '):
+                return float(line.split()[-1])
+        return None
+
+    def test_queries_while_streaming_count_for_the_view(self):
+        user = get_user_model().objects.create_user(username='exporter')
+        self.client.force_login(user)
+        queries = []
+
+        def record(execute, sql, *args):
+            queries.append(sql)
+            return execute(sql, *args)
+        with connection.execute_wrapper(record):
+            response = self.client.get(reverse('posts:export_data'))
+            b''.join(response.streaming_content)
+        self.assertTrue(any('posts_post' in sql for sql in queries))
+        self.assertEqual(
+            self.sample('yatube_db_queries_sum{view="posts:export_data"}'),
+            len(queries)
+        )
+
+    def test_snapshots_of_all_processes_are_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        labels = ['posts:index', 'GET', 200]
+        with open(os.path.join(directory, '1.json'), 'w') as target:
+            json.dump({'yatube_requests_total': [[labels, 5]]}, target)
+        with override_settings(METRICS_DIR=directory):
+            reset_metrics()
+            self.client.get(reverse('posts:index'))
+            self.assertEqual(self.sample(
+                'yatube_requests_total{view="posts:index",method="GET",'
+                'status="200"}'
+            ), 6)
+            self.assertTrue(
+                os.path.exists(os.path.join(directory, f'{os.getpid()}.json'))
+            )
+
+    def test_endpoint_is_limited_to_allowed_ips(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.1'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+@query_budget(queries=1, rows=1)
+def list_users(request):
+    return HttpResponse(', '.join(
+        user.username for user in get_user_model().objects.all()
+    ) + str(get_user_model().objects.count()))
+
+
+@query_budget(queries=1)
+def stream_users(request):
+    return StreamingHttpResponse(
+        user.username for user in get_user_model().objects.all()
+        for _ in range(get_user_model().objects.count())
+    )
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in ('first', 'second'):
+            get_user_model().objects.create_user(username=name)
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_raise_mode_fails_with_offending_sql(self):
+        with self.assertRaises(BudgetExceeded) as raised:
+            list_users(self.request)
+        message = str(raised.exception)
+        self.assertIn('core.tests.list_users', message)
+        self.assertIn('запросов 2 > 1', message)
+        self.assertIn('строк 2 > 1', message)
+        self.assertIn('COUNT(*)', message)
+
+    @override_settings(QUERY_BUDGET_MODE='raise')
+    def test_streaming_queries_count_for_the_view(self):
+        response = stream_users(self.request)
+        with self.assertRaises(BudgetExceeded) as raised:
+            b''.join(response.streaming_content)
+        self.assertIn('запросов 3 > 1', str(raised.exception))
+
+    @override_settings(QUERY_BUDGET_MODE='log')
+    def test_log_mode_only_logs(self):
+        with self.assertLogs('core.budgets', 'WARNING') as logs:
+            response = list_users(self.request)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('превышен бюджет', logs.output[0])
+
+    @override_settings(QUERY_BUDGET_MODE='off')
+    def test_off_mode_does_not_track(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                list_users(self.request).status_code, HTTPStatus.OK
+            )
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(SINGLE_PROCESS=False)
+    def test_process_local_cache_fails_deploy_check(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)], ['core.E001']
+        )
+        with mock.patch('core.cache.is_process_local', return_value=False):
+            self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(SINGLE_PROCESS=True)
+    def test_single_process_may_use_local_cache(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,39 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = 'version:{}'
+
+
+def _initial_version():
+    # Если счётчик вытеснен из кэша, новое значение всё равно будет больше
+    # всех выданных ранее, и старые фрагменты не оживут.
+    return int(time.time() * 1_000_000)
+
+
+def get_versions(scopes):
+    keys = {VERSION_KEY.format(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    missing = {
+        key: _initial_version() for key in keys if key not in found
+    }
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def version_key(*scopes):
+    versions = get_versions(scopes)
+    raw = ':'.join(f'{scope}={versions[scope]}' for scope in scopes)
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
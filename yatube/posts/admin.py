@@ -1,26 +1,45 @@
 from django.contrib import admin
 
+from core.paginators import EstimatedCountPaginator
 from .models import Comment, Group, Post
+from .search import filter_matching
 
 
-class PostAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без точного COUNT(*) и без выпадающих списков по внешним
+    ключам: число запросов не зависит от размера таблицы."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
-    list_editable = ('group',)
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author', 'group')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_matching(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description',)
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
     prepopulated_fields = {'slug': ('title',)}
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ('pk', 'post', 'text', 'author', 'created')
+    list_select_related = ('post', 'author')
     search_fields = ('text',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'created'
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
 
 
 admin.site.register(Post, PostAdmin)
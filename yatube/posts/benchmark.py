@@ -0,0 +1,488 @@
+import math
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from io import StringIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Max, Min
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from core.middleware import CACHE_HEADER
+from . import importing
+from .models import Comment, Follow, Group, Post, User
+from .urls import urlpatterns
+
+SIZES = {'small': 10_000, 'medium': 1_000_000, 'large': 10_000_000}
+PREFIX = 'bench'
+# Даты постов фиксированы, чтобы один seed давал одинаковые данные.
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+SPAN = timedelta(days=730)
+SENTENCES = 2000
+SAMPLES = 200
+
+
+def dataset_shape(posts):
+    """Пропорции как у живого сайта: автор на 50 постов, комментарий на
+    два поста, в среднем 20 подписок на пользователя."""
+    users = max(posts // 50, 10)
+    return {
+        'users': users,
+        'groups': max(min(posts // 1000, 2000), 5),
+        'posts': posts,
+        'comments': posts // 2,
+        'follows_per_user': min(20, users - 1),
+    }
+
+
+def zipf_weights(size, exponent=1.1):
+    # Немногие популярные авторы пишут и собирают подписчиков больше всех.
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(size)))
+
+
+class DatasetGenerator:
+    def __init__(self, posts, seed=0):
+        self.shape = dataset_shape(posts)
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.sentences = [
+            self.fake.sentence(nb_words=10) for _ in range(SENTENCES)
+        ]
+        self.weights = zipf_weights(self.shape['users'])
+        self.password = make_password(None)
+        self.first_ids = {
+            model: (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+            for model in (User, Group, Post, Comment)
+        }
+
+    def text(self, sentences):
+        return ' '.join(self.random.choices(self.sentences, k=sentences))
+
+    def user_id(self):
+        index = self.random.choices(
+            range(self.shape['users']), cum_weights=self.weights
+        )[0]
+        return self.first_ids[User] + index
+
+    def post_date(self, index):
+        return EPOCH + SPAN * index / self.shape['posts']
+
+    def users(self):
+        first = self.first_ids[User]
+        for index in range(self.shape['users']):
+            yield User(
+                id=first + index,
+                username=f'{PREFIX}{index}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=f'{PREFIX}{index}@example.com',
+                password=self.password,
+                date_joined=EPOCH - timedelta(days=self.random.randrange(365)),
+            )
+
+    def groups(self):
+        first = self.first_ids[Group]
+        for index in range(self.shape['groups']):
+            yield Group(
+                id=first + index,
+                title=self.fake.catch_phrase()[:200],
+                slug=f'{PREFIX}-{index}',
+                description=self.text(2),
+            )
+
+    def posts(self):
+        first, groups = self.first_ids[Post], self.shape['groups']
+        for index in range(self.shape['posts']):
+            group = self.random.randrange(groups * 2)
+            yield Post(
+                id=first + index,
+                author_id=self.user_id(),
+                # Половина постов без группы.
+                group_id=self.first_ids[Group] + group
+                if group < groups else None,
+                text=self.text(self.random.randint(1, 6)),
+                pub_date=self.post_date(index),
+            )
+
+    def comments(self):
+        first, posts = self.first_ids[Comment], self.shape['posts']
+        for index in range(self.shape['comments']):
+            # Свежие посты обсуждают чаще старых.
+            post = int(posts * self.random.random() ** 0.5)
+            yield Comment(
+                id=first + index,
+                post_id=self.first_ids[Post] + post,
+                author_id=self.user_id(),
+                text=self.text(1),
+                created=self.post_date(post) + timedelta(
+                    minutes=self.random.randrange(1, 600)
+                ),
+            )
+
+    def follows(self):
+        for index in range(self.shape['users']):
+            user_id = self.first_ids[User] + index
+            mean = self.shape['follows_per_user']
+            count = min(
+                int(self.random.expovariate(1 / mean)),
+                self.shape['users'] - 1
+            )
+            authors = {self.user_id() for _ in range(count)}
+            authors.discard(user_id)
+            for author_id in sorted(authors):
+                yield Follow(user_id=user_id, author_id=author_id)
+
+
+def seed_dataset(posts, seed=0, batch_size=5000, stdout=None):
+    """Заполняет базу детерминированным набором данных с пользователями
+    bench<N> и группами bench-<N>."""
+    if User.objects.filter(username=f'{PREFIX}0').exists():
+        raise ValueError('Набор данных уже загружен, сначала удалите его')
+    generator = DatasetGenerator(posts, seed)
+    sources = {
+        'users': generator.users(),
+        'groups': generator.groups(),
+        'posts': generator.posts(),
+        'comments': generator.comments(),
+        'follows': generator.follows(),
+    }
+    for kind, objects in sources.items():
+        model = importing.KINDS[kind][0]
+        written = 0
+        started = time.monotonic()
+        for batch in importing.batches(objects, batch_size):
+            with transaction.atomic():
+                # Размер одного INSERT Django подбирает под ограничения СУБД.
+                model.objects.bulk_create(batch)
+            written += len(batch)
+        importing.reset_sequences(kind)
+        elapsed = time.monotonic() - started
+        _write(stdout, f'{kind}: {written} за {elapsed:.1f} с')
+    importing.rebuild_derived(stdout=stdout or StringIO())
+    return generator.shape
+
+
+def _write(stdout, message):
+    if stdout is not None:
+        stdout.write(message)
+
+
+def flush_dataset():
+    Group.objects.filter(slug__startswith=f'{PREFIX}-').delete()
+    return User.objects.filter(username__regex=rf'^{PREFIX}\d+$').delete()
+
+
+def dataset_counts():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+class Target:
+    """writes — маршрут меняет данные: его запросы откатываются."""
+
+    def __init__(self, name, make_path, method='GET', auth=False, data=None,
+                 writes=False):
+        self.name = name
+        self.make_path = make_path
+        self.method = method
+        self.auth = auth
+        self.data = data
+        self.writes = writes
+
+
+def _sample(queryset, field, rng):
+    # ORDER BY RANDOM() на миллионах строк сортирует всю таблицу, поэтому
+    # выборка идёт по случайным точкам диапазона первичного ключа.
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        raise ValueError('Нет данных для бенчмарка, запустите seed_dataset')
+    values = sorted({
+        queryset.filter(pk__gte=rng.randint(bounds['low'], bounds['high']))
+        .order_by('pk').values_list(field, flat=True)[:1].get()
+        for _ in range(SAMPLES)
+    })
+    return lambda: rng.choice(values)
+
+
+def build_targets(user, seed=0):
+    """По цели на каждый маршрут posts/urls.py. Параметры URL каждый раз
+    берутся из выборки существующих объектов."""
+    rng = random.Random(seed)
+    post = _sample(Post.objects.all(), 'id', rng)
+    own_post = _sample(user.posts.all(), 'id', rng)
+    slug = _sample(Group.objects.all(), 'slug', rng)
+    author = _sample(User.objects.exclude(pk=user.pk), 'username', rng)
+    word = _sample(Post.objects.all(), 'text', rng)
+
+    def url(name, *args):
+        return reverse(f'posts:{name}', args=args)
+
+    targets = [
+        Target('index', lambda: url('index')),
+        Target('group_list', lambda: url('group_list', slug())),
+        Target('profile', lambda: url('profile', author())),
+        Target('post_detail', lambda: url('post_detail', post())),
+        Target('post_comments', lambda: url('post_comments', post())),
+        Target(
+            'search',
+            lambda: url('search') + '?q=' + word().split()[0].strip('.,')
+        ),
+        Target('post_create', lambda: url('post_create'), auth=True),
+        Target('post_edit', lambda: url('post_edit', own_post()), auth=True),
+        Target(
+            'add_comment', lambda: url('add_comment', post()), method='POST',
+            auth=True, data={'text': 'Комментарий из бенчмарка'},
+            writes=True
+        ),
+        Target('follow_index', lambda: url('follow_index'), auth=True),
+        Target('export_data', lambda: url('export_data'), auth=True),
+        Target(
+            'profile_follow', lambda: url('profile_follow', author()),
+            auth=True, writes=True
+        ),
+        Target(
+            'profile_unfollow', lambda: url('profile_unfollow', author()),
+            auth=True, writes=True
+        ),
+    ]
+    missing = {
+        pattern.name for pattern in urlpatterns
+    } - {target.name for target in targets}
+    if missing:
+        raise ValueError(f'Нет целей для маршрутов: {sorted(missing)}')
+    return targets
+
+
+def auth_cookies(user):
+    # Сессия и CSRF-токен получаются так же, как у обычного браузера.
+    client = Client()
+    client.force_login(user)
+    client.get(reverse('posts:post_create'))
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    token = client.cookies[settings.CSRF_COOKIE_NAME].value
+    return {
+        'HTTP_COOKIE': (
+            f'{settings.SESSION_COOKIE_NAME}={session}; '
+            f'{settings.CSRF_COOKIE_NAME}={token}'
+        ),
+        'HTTP_X_CSRFTOKEN': token,
+    }
+
+
+def percentile(values, fraction):
+    # Ближайший ранг: значение, которое не превышают fraction запросов.
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+@contextmanager
+def rolled_back(lock):
+    """Запрос пишущей цели выполняется в транзакции, которая затем
+    откатывается: набор данных после прогона тот же, и повторные прогоны
+    сравнимы. У SQLite один писатель, а две транзакции, одновременно
+    повышающие блокировку до записи, падают с «database is locked»,
+    поэтому такие запросы идут по одному."""
+    with lock, transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def kept_connections():
+    # WSGI-приложение закрывает соединение, открытое посреди транзакции,
+    # в request_started/request_finished. Как и тестовый клиент, раннер
+    # на время прогона сам управляет соединениями (Runner.client).
+    signals = (request_started, request_finished)
+    for signal in signals:
+        signal.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        for signal in signals:
+            signal.connect(close_old_connections)
+
+
+class Runner:
+    def __init__(self, cookies, cold=False):
+        self.application = get_wsgi_application()
+        self.factory = RequestFactory()
+        self.cookies = cookies
+        self.cold = cold
+        self.write_lock = threading.Lock()
+
+    def environ(self, target):
+        extra = self.cookies if target.auth else {}
+        if target.method == 'POST':
+            request = self.factory.post(
+                target.make_path(), target.data, **extra
+            )
+        else:
+            request = self.factory.get(target.make_path(), **extra)
+        return request.environ
+
+    def request(self, target):
+        """Один запрос через WSGI-приложение: (статус, секунды, SQL,
+        X-Page-Cache или None)."""
+        queries = 0
+        statuses = []
+        page_cache = None
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        def start_response(status, headers, exc_info=None):
+            nonlocal page_cache
+            statuses.append(int(status.split()[0]))
+            page_cache = dict(headers).get(CACHE_HEADER)
+
+        environ = self.environ(target)
+        if self.cold:
+            cache.clear()
+        with ExitStack() as stack:
+            if target.writes:
+                stack.enter_context(rolled_back(self.write_lock))
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            started = time.perf_counter()
+            response = self.application(environ, start_response)
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+            elapsed = time.perf_counter() - started
+        return statuses[0], elapsed, queries, page_cache
+
+    def client(self, target, count):
+        try:
+            return [self.request(target) for _ in range(count)]
+        finally:
+            connections.close_all()
+
+    def run(self, target, requests, clients, warmup):
+        for _ in range(warmup):
+            self.request(target)
+        started = time.perf_counter()
+        if clients > 1:
+            shares = [
+                requests // clients + (index < requests % clients)
+                for index in range(clients)
+            ]
+            with ThreadPoolExecutor(clients) as pool:
+                chunks = pool.map(
+                    lambda share: self.client(target, share), shares
+                )
+                samples = [sample for chunk in chunks for sample in chunk]
+        else:
+            samples = [self.request(target) for _ in range(requests)]
+        return summarize(samples, time.perf_counter() - started)
+
+
+def summarize(samples, elapsed):
+    """Сводка по замерам. Ответы из кэша страниц и отрендеренные заново
+    дополнительно сводятся отдельно (page_cache): в общем p50 тёплого
+    прогона почти одни попадания."""
+    statuses = {}
+    for status, *_ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    latencies = [sample[1] * 1000 for sample in samples]
+    queries = [sample[2] for sample in samples]
+    summary = {
+        'requests': len(samples),
+        'statuses': statuses,
+        'errors': sum(
+            count for status, count in statuses.items() if int(status) >= 500
+        ),
+        'throughput_rps': round(len(samples) / max(elapsed, 1e-9), 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'mean': round(sum(latencies) / len(latencies), 2),
+            'max': round(max(latencies), 2),
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        },
+    }
+    outcomes = {sample[3] for sample in samples} - {None}
+    if outcomes:
+        summary['page_cache'] = {}
+        for outcome in sorted(outcomes):
+            part = [sample for sample in samples if sample[3] == outcome]
+            latencies = [sample[1] * 1000 for sample in part]
+            summary['page_cache'][outcome.lower()] = {
+                'requests': len(part),
+                'p50': round(percentile(latencies, 0.50), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'queries_mean': round(
+                    sum(sample[2] for sample in part) / len(part), 2
+                ),
+            }
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            cwd=settings.BASE_DIR, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(user, requests=200, clients=8, warmup=10, seed=0,
+                  only=None, cold=False, stdout=None):
+    """Прогоняет каждый маршрут posts через WSGI-приложение с clients
+    параллельными клиентами и возвращает отчёт для сохранения в JSON.
+    cold — очищать кэш перед каждым запросом."""
+    targets = build_targets(user, seed)
+    if only:
+        targets = [target for target in targets if target.name in only]
+    runner = Runner(auth_cookies(user), cold)
+    results = {}
+    for target in targets:
+        with kept_connections():
+            result = runner.run(target, requests, clients, warmup)
+        results[target.name] = {'method': target.method, **result}
+        _write(
+            stdout,
+            f'{target.name}: p50 {result["latency_ms"]["p50"]} мс, '
+            f'p95 {result["latency_ms"]["p95"]} мс, '
+            f'{result["throughput_rps"]} запросов/с, '
+            f'SQL {result["queries"]["mean"]}'
+        )
+    return {
+        'commit': git_commit(),
+        'created': timezone.now().isoformat(),
+        'database': connections['default'].vendor,
+        'dataset': dataset_counts(),
+        'clients': clients,
+        'cold': cold,
+        'requests_per_url': requests,
+        'user': user.username,
+        'results': results,
+    }
@@ -0,0 +1,79 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _count_of(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def _shifted(field, delta):
+    # Не ниже нуля: счётчик, заведённый до rebuild_counters, или повторное
+    # удаление иначе упёрлись бы в CHECK положительного поля.
+    return Greatest(F(field) + delta, 0)
+
+
+def bump_user_posts(user_id, delta):
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        posts_count=_shifted('posts_count', delta)
+    )
+    if not updated and delta > 0:
+        UserStats.objects.get_or_create(
+            user_id=user_id,
+            defaults={
+                'posts_count': Post.objects.filter(author_id=user_id).count()
+            }
+        )
+
+
+def bump_user_follows(user_id, author_id, delta):
+    UserStats.objects.filter(user_id=user_id).update(
+        following_count=_shifted('following_count', delta)
+    )
+    UserStats.objects.filter(user_id=author_id).update(
+        followers_count=_shifted('followers_count', delta)
+    )
+
+
+def bump_group_posts(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=_shifted('posts_count', delta)
+        )
+
+
+def bump_post_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shifted('comments_count', delta)
+    )
+
+
+def rebuild_counters():
+    UserStats.objects.bulk_create(
+        [
+            UserStats(user_id=pk)
+            for pk in User.objects.filter(stats__isnull=True)
+            .values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+    UserStats.objects.update(
+        posts_count=_count_of(Post.objects.all(), 'author'),
+        followers_count=_count_of(Follow.objects.all(), 'author'),
+        following_count=_count_of(Follow.objects.all(), 'user'),
+    )
+    Group.objects.update(posts_count=_count_of(Post.objects.all(), 'group'))
+    Post.objects.update(
+        comments_count=_count_of(Comment.objects.all(), 'post')
+    )
@@ -0,0 +1,90 @@
+import json
+import zlib
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import Comment, Follow, Group, Post, User
+
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+USER_FIELDS = {
+    name: name for name in
+    ('username', 'email', 'first_name', 'last_name', 'date_joined')
+}
+GROUP_FIELDS = {name: name for name in ('title', 'slug', 'description')}
+POST_FIELDS = {
+    'id': 'id', 'author': 'author__username', 'group': 'group__slug',
+    'text': 'text', 'pub_date': 'pub_date', 'image': 'image',
+}
+COMMENT_FIELDS = {
+    'id': 'id', 'post': 'post_id', 'author': 'author__username',
+    'text': 'text', 'created': 'created',
+}
+FOLLOW_FIELDS = {'user': 'user__username', 'author': 'author__username'}
+
+
+def _rows(kind, queryset, fields, chunk_size):
+    # values_list() + iterator(): в памяти одновременно только chunk_size
+    # строк, модели не создаются.
+    names = list(fields)
+    values = queryset.order_by('pk').values_list(*fields.values())
+    for row in values.iterator(chunk_size=chunk_size):
+        yield {'type': kind, **dict(zip(names, row))}
+
+
+def _date_fields(row, *names):
+    for name in names:
+        if row.get(name) is not None:
+            row[name] = row[name].isoformat()
+    return row
+
+
+def export_rows(user=None, with_passwords=False, chunk_size=None):
+    """Строки выгрузки в формате import_data, каждая с полем type.
+    Без user выгружается весь сайт."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    users = User.objects.all()
+    posts = Post.objects.all()
+    comments = Comment.objects.all()
+    follows = Follow.objects.all()
+    if user is not None:
+        users = users.filter(pk=user.pk)
+        posts = posts.filter(author=user)
+        comments = comments.filter(author=user)
+        follows = follows.filter(user=user)
+
+    user_fields = dict(USER_FIELDS)
+    if with_passwords:
+        user_fields['password'] = 'password'
+    for row in _rows('users', users, user_fields, chunk_size):
+        yield _date_fields(row, 'date_joined')
+
+    if user is None:
+        yield from _rows(
+            'groups', Group.objects.all(), GROUP_FIELDS, chunk_size
+        )
+
+    for row in _rows('posts', posts, POST_FIELDS, chunk_size):
+        if row['image']:
+            row['image_url'] = default_storage.url(row['image'])
+        yield _date_fields(row, 'pub_date')
+
+    for row in _rows('comments', comments, COMMENT_FIELDS, chunk_size):
+        yield _date_fields(row, 'created')
+
+    yield from _rows('follows', follows, FOLLOW_FIELDS, chunk_size)
+
+
+def jsonl(rows):
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False) + '\n').encode()
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(wbits=GZIP_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,189 @@
+from django.conf import settings
+
+from core.paginators import BACKWARD, FORWARD, LAST, CursorPaginator
+from . import follow_graph
+from .models import FeedEntry, Follow, Post
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def _followers_count(author_id):
+    # Счёт до FEED_FANOUT_MAX_FOLLOWERS + 2: этого хватает, чтобы отличить
+    # только что перешедшего порог автора от давней знаменитости.
+    limit = settings.FEED_FANOUT_MAX_FOLLOWERS
+    return Follow.objects.filter(author_id=author_id)[:limit + 2].count()
+
+
+def is_celebrity(author_id):
+    """Проверка для записи в ленты — по Follow, а не по кэшу follow_graph:
+    кэш у каждого процесса свой и в воркере задач может отставать."""
+    return _followers_count(author_id) > settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def celebrity_followees(user):
+    followees = follow_graph.followees(user.id)
+    return [
+        pk for pk, count in follow_graph.follower_counts(followees).items()
+        if count > settings.FEED_FANOUT_MAX_FOLLOWERS
+    ]
+
+
+def _insert_entries(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def _fan_out(author_id, posts):
+    followers = (
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+    batch = []
+    for user_id in followers:
+        for post_id, pub_date in posts:
+            batch.append(FeedEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date,
+            ))
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            _insert_entries(batch)
+            batch = []
+    _insert_entries(batch)
+
+
+def _author_posts(author_id):
+    """Все посты автора пачками по FANOUT_BATCH_SIZE, от новых к старым.
+    Keyset, а не OFFSET: длинная история читается за линейное время."""
+    paginator = CursorPaginator(
+        Post.objects.filter(author_id=author_id).values_list('pub_date', 'id'),
+        FANOUT_BATCH_SIZE,
+    )
+    values = None
+    while True:
+        rows = paginator.fetch(FORWARD, values, FANOUT_BATCH_SIZE)
+        if not rows:
+            return
+        yield [(post_id, pub_date) for pub_date, post_id in rows]
+        values = rows[-1]
+
+
+def fan_out_post(post):
+    if is_celebrity(post.author_id):
+        return
+    _fan_out(post.author_id, [(post.id, post.pub_date)])
+
+
+def backfill_author(author_id):
+    """Посты, написанные автором, пока он был знаменитостью, ни в одну
+    ленту не рассылались. Когда он опускается до порога, вся его история
+    дописывается всем подписчикам."""
+    if is_celebrity(author_id):
+        return
+    for posts in _author_posts(author_id):
+        _fan_out(author_id, posts)
+
+
+def _insert_follow(user_id, author_id, posts):
+    _insert_entries([
+        FeedEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts
+    ])
+
+
+def backfill_follow(user_id, author_id):
+    """Дописывает в ленту подписчика всю историю автора."""
+    if is_celebrity(author_id):
+        return
+    for posts in _author_posts(author_id):
+        _insert_follow(user_id, author_id, posts)
+
+
+def add_follow(user_id, author_id):
+    """Подписка: последние FEED_BACKFILL_POSTS постов автора сразу
+    попадают в ленту. True — за ними есть ещё история, её дописывает
+    задача. Автор, перешедший с этой подпиской FEED_FANOUT_MAX_FOLLOWERS,
+    сбрасывает закэшированные числа подписчиков."""
+    limit = settings.FEED_FANOUT_MAX_FOLLOWERS
+    followers = _followers_count(author_id)
+    if followers == limit + 1:
+        follow_graph.forget_followers()
+    if followers > limit:
+        return False
+    shown = settings.FEED_BACKFILL_POSTS
+    posts = list(
+        Post.objects.filter(author_id=author_id)
+        .values_list('id', 'pub_date')[:shown + 1]
+    )
+    _insert_follow(user_id, author_id, posts[:shown])
+    return len(posts) > shown
+
+
+def drop_follow(user_id, author_id):
+    """Отписка. True — автор опустился до FEED_FANOUT_MAX_FOLLOWERS, и
+    его посты пора разослать подписчикам (backfill_author)."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    if _followers_count(author_id) != settings.FEED_FANOUT_MAX_FOLLOWERS:
+        return False
+    follow_graph.forget_followers()
+    return True
+
+
+def rebuild_feed(user):
+    FeedEntry.objects.filter(user=user).delete()
+    for author_id in (
+        Follow.objects.filter(user=user).values_list('author_id', flat=True)
+    ):
+        backfill_follow(user.id, author_id)
+
+
+class FollowFeedPaginator(CursorPaginator):
+    """Лента подписок: записи обычных авторов читаются из FeedEntry,
+    посты авторов с огромным числом подписчиков подтягиваются при чтении."""
+
+    def __init__(self, user, per_page):
+        super().__init__(
+            Post.objects.select_related('author', 'group'), per_page
+        )
+        self.user = user
+
+    def _entries(self, celebrities):
+        # Запись, которую фан-аут успел вставить уже после отписки,
+        # отсекается проверкой подписки.
+        return FeedEntry.objects.filter(
+            user=self.user,
+            author_id__in=Follow.objects.filter(user=self.user)
+            .values('author_id'),
+        ).exclude(author_id__in=celebrities)
+
+    def fetch(self, direction, values, limit, offset=0):
+        # Источника два, поэтому пропуск делается после слияния: из
+        # каждого берутся offset + limit записей.
+        celebrities = celebrity_followees(self.user)
+        wanted = offset + limit
+        entries = CursorPaginator(
+            self._entries(celebrities)
+            .select_related('post__author', 'post__group'),
+            wanted,
+            ordering=('-pub_date', '-post_id'),
+        )
+        posts = [
+            entry.post for entry in entries.fetch(direction, values, wanted)
+        ]
+        if celebrities:
+            posts.extend(CursorPaginator(
+                self.object_list.filter(author_id__in=celebrities), wanted
+            ).fetch(direction, values, wanted))
+            posts.sort(
+                key=self.key_values,
+                reverse=direction not in (BACKWARD, LAST)
+            )
+        return posts[offset:wanted]
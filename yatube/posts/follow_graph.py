@@ -0,0 +1,145 @@
+from array import array
+from bisect import bisect_left
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from core.routers import reading_from_replica
+from core.versions import bump, get_versions
+from .models import Follow
+
+FOLLOWEES_KEY = 'followees:{}'
+# Ключ подписчиков включает поколение FOLLOWERS_SCOPE: forget_followers()
+# сменой поколения сбрасывает их разом, в том числе записанные читателем,
+# который начал читать Follow ещё до коммита подписки.
+FOLLOWERS_KEY = 'followers:{}:{}'
+FOLLOWERS_SCOPE = 'follow-graph:followers'
+# Беззнаковые 32-битные id: 4 байта на подписку вместо объекта int в set.
+TYPECODE = 'I'
+
+
+def _ids(values):
+    return array(TYPECODE, sorted(values))
+
+
+def contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def followers_key():
+    """Ключ подписчиков автора в текущем поколении: функция от его id."""
+    generation = get_versions([FOLLOWERS_SCOPE])[FOLLOWERS_SCOPE]
+    return partial(FOLLOWERS_KEY.format, generation)
+
+
+def _cached(make_key, pks):
+    keys = {make_key(pk): pk for pk in pks}
+    return {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+
+
+def followees_of(user_ids):
+    """Отсортированные id авторов, на которых подписан каждый из
+    пользователей. Промахи кэша догружаются одним запросом."""
+    found = _cached(FOLLOWEES_KEY.format, user_ids)
+    missing = [pk for pk in user_ids if pk not in found]
+    if missing:
+        grouped = {pk: [] for pk in missing}
+        for user_id, author_id in Follow.objects.filter(
+            user_id__in=missing
+        ).values_list('user_id', 'author_id'):
+            grouped[user_id].append(author_id)
+        fetched = {pk: _ids(values) for pk, values in grouped.items()}
+        if not reading_from_replica():
+            cache.set_many({
+                FOLLOWEES_KEY.format(pk): ids for pk, ids in fetched.items()
+            }, settings.FOLLOW_GRAPH_TIMEOUT)
+        found.update(fetched)
+    return found
+
+
+def followers_of(author_ids):
+    """Подписчики каждого автора: отсортированный массив id или, если
+    подписчиков больше FEED_FANOUT_MAX_FOLLOWERS, только их число —
+    такие множества слишком велики для кэша, а рассылка по ним не идёт."""
+    make_key = followers_key()
+    found = _cached(make_key, author_ids)
+    missing = [pk for pk in author_ids if pk not in found]
+    if missing:
+        fetched = dict.fromkeys(missing, 0)
+        fetched.update(
+            Follow.objects.filter(author_id__in=missing)
+            .values_list('author')
+            .annotate(Count('id'))
+            .order_by()
+        )
+        limit = settings.FEED_FANOUT_MAX_FOLLOWERS
+        small = [
+            pk for pk, count in fetched.items() if 0 < count <= limit
+        ]
+        grouped = {pk: [] for pk in small}
+        if small:
+            for author_id, user_id in Follow.objects.filter(
+                author_id__in=small
+            ).values_list('author_id', 'user_id'):
+                grouped[author_id].append(user_id)
+        for pk, count in fetched.items():
+            if count <= limit:
+                fetched[pk] = _ids(grouped.get(pk, ()))
+        if not reading_from_replica():
+            cache.set_many({
+                make_key(pk): ids for pk, ids in fetched.items()
+            }, settings.FOLLOW_GRAPH_TIMEOUT)
+        found.update(fetched)
+    return found
+
+
+def followees(user_id):
+    return followees_of([user_id])[user_id]
+
+
+def followers(author_id):
+    """Массив id подписчиков или None, если автор — знаменитость."""
+    value = followers_of([author_id])[author_id]
+    return value if isinstance(value, array) else None
+
+
+def follower_counts(author_ids):
+    return {
+        pk: len(value) if isinstance(value, array) else value
+        for pk, value in followers_of(author_ids).items()
+    }
+
+
+def is_following(user_id, author_id):
+    if user_id is None:
+        return False
+    return contains(followees(user_id), author_id)
+
+
+def forget(*user_ids):
+    """Сбрасывает оба множества пользователей: следующее чтение соберёт их
+    заново из Follow. Правка массива на месте потеряла бы параллельные
+    подписки на одного автора. Повторный сброс после коммита не даёт
+    закэшировать состояние, прочитанное до него."""
+    def keys():
+        templates = (FOLLOWEES_KEY.format, followers_key())
+        return [make_key(pk) for pk in user_ids for make_key in templates]
+
+    cache.delete_many(keys())
+    transaction.on_commit(lambda: cache.delete_many(keys()))
+
+
+def forget_followers():
+    """Сбрасывает подписчиков всех авторов, как forget() — сразу и после
+    коммита. Нужно, когда автор переходит FEED_FANOUT_MAX_FOLLOWERS: по
+    закэшированному числу подписчиков лента решает, читать ли его посты
+    напрямую, и устаревшая запись скрывала бы их до истечения
+    FOLLOW_GRAPH_TIMEOUT."""
+    bump(FOLLOWERS_SCOPE)
+    transaction.on_commit(lambda: bump(FOLLOWERS_SCOPE))
@@ -1,6 +1,6 @@
 from django import forms
 
-from .models import Comment, Post
+from .models import Comment, Group, Post, User
 
 
 class PostForm(forms.ModelForm):
@@ -20,3 +20,20 @@ class CommentForm(forms.ModelForm):
         help_texts = {
             'text': 'Текст комментария'
         }
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200)
+    group = forms.ModelChoiceField(
+        label='Группа',
+        queryset=Group.objects.all(),
+        to_field_name='slug',
+        required=False
+    )
+    author = forms.ModelChoiceField(
+        label='Автор',
+        queryset=User.objects.all(),
+        to_field_name='username',
+        widget=forms.TextInput,
+        required=False
+    )
@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+from django.conf import settings
+
+from core.routers import reading_from_replica
+from core.versions import bump, version_key
+from . import follow_graph
+
+FeedCache = namedtuple('FeedCache', ('timeout', 'version', 'scopes'))
+
+
+def feed_cache(*scopes):
+    # Фрагмент, собранный по реплике, читается из кэша, но не сохраняется:
+    # с таймаутом 0 запись сразу устаревает.
+    timeout = 0 if reading_from_replica() else settings.FEED_CACHE_TIMEOUT
+    return FeedCache(timeout, version_key(*scopes), scopes)
+
+
+INDEX_SCOPES = ('posts', 'groups', 'users')
+
+
+def group_scopes(group_id):
+    return (f'group:{group_id}', 'groups', 'users')
+
+
+def profile_scopes(author_id):
+    return (f'author:{author_id}', 'groups')
+
+
+def index_cache():
+    return feed_cache(*INDEX_SCOPES)
+
+
+def group_cache(group):
+    return feed_cache(*group_scopes(group.id))
+
+
+def profile_cache(author):
+    return feed_cache(*profile_scopes(author.id))
+
+
+def follow_cache(user):
+    return feed_cache(
+        f'follower:{user.id}', 'groups', 'users',
+        *(f'author:{pk}' for pk in follow_graph.followees(user.id))
+    )
+
+
+def post_scopes(post):
+    scopes = [f'post:{post.id}', f'author:{post.author_id}', 'users']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+def bump_post_versions(post, previous_group_id=None):
+    scopes = ['posts', f'author:{post.author_id}', f'post:{post.id}']
+    for group_id in {post.group_id, previous_group_id} - {None}:
+        scopes.append(f'group:{group_id}')
+    bump(*scopes)
@@ -0,0 +1,56 @@
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.exporting import export_rows, gzipped, jsonl
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает данные пользователя или всего сайта в JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Выгрузить только данные этого пользователя'
+        )
+        parser.add_argument(
+            '--output', default='-', help='Файл выгрузки (по умолчанию stdout)'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать выгрузку gzip'
+        )
+        parser.add_argument(
+            '--with-passwords', action='store_true',
+            help='Добавить хэши паролей (для резервной копии сайта)'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+            help='Строк, читаемых из базы за раз'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(
+                    f'Пользователь {options["user"]} не найден'
+                )
+        chunks = jsonl(export_rows(
+            user,
+            with_passwords=options['with_passwords'],
+            chunk_size=options['chunk_size']
+        ))
+        if options['gzip']:
+            chunks = gzipped(chunks)
+        if options['output'] == '-':
+            target = sys.stdout.buffer
+        else:
+            target = open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                target.write(chunk)
+        finally:
+            if target is not sys.stdout.buffer:
+                target.close()
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate_in_worker, generate_post_thumbnails
+
+# Сколько постов на поток отдаётся пулу за раз: pool.map по всей таблице
+# сразу поставил бы в очередь по задаче на каждый пост.
+BATCH_PER_WORKER = 16
+
+
+class Command(BaseCommand):
+    help = 'Создаёт все размеры миниатюр для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.POST_THUMBNAIL_WORKERS,
+            help='Количество потоков генерации'
+        )
+
+    def handle(self, *args, **options):
+        post_ids = (
+            Post.objects.exclude(image='')
+            .values_list('id', flat=True)
+            .iterator()
+        )
+        processed = 0
+        if options['workers'] <= 1:
+            for post_id in post_ids:
+                generate_post_thumbnails(post_id)
+                processed += 1
+        else:
+            batch_size = options['workers'] * BATCH_PER_WORKER
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                while True:
+                    batch = list(islice(post_ids, batch_size))
+                    if not batch:
+                        break
+                    for _ in pool.map(generate_in_worker, batch):
+                        processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано постов с картинками: {processed}')
+        )
@@ -0,0 +1,93 @@
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import importing
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует пользователей, группы, посты, комментарии '
+        'или подписки из JSONL или CSV'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(importing.KINDS))
+        parser.add_argument('path', help='Файл выгрузки')
+        parser.add_argument(
+            '--format', choices=importing.FORMATS,
+            help='Формат файла (по умолчанию по расширению)'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Строк в одном INSERT'
+        )
+        parser.add_argument(
+            '--batches-per-transaction', type=int, default=10,
+            help='Пачек в одной транзакции; после неё пишется чекпоинт'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл чекпоинта (по умолчанию <path>.checkpoint)'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Игнорировать сохранённый чекпоинт'
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс'
+        )
+
+    def handle(self, *args, **options):
+        kind, path = options['kind'], options['path']
+        data_format = options['format'] or importing.detect_format(path)
+        if data_format not in importing.FORMATS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        if options['batch_size'] < 1 or options['batches_per_transaction'] < 1:
+            raise CommandError('Размеры пачек должны быть больше нуля')
+        checkpoint = options['checkpoint'] or f'{path}.checkpoint'
+        done = 0
+        if not options['restart']:
+            done = importing.read_checkpoint(checkpoint, kind)
+        if done:
+            self.stdout.write(f'Продолжаем с чекпоинта, пропущено: {done}')
+
+        rows = importing.rows_of_kind(
+            importing.read_rows(path, data_format), kind
+        )
+        rows = islice(rows, done, None)
+        chunk_rows = options['batch_size'] * options['batches_per_transaction']
+        started = time.monotonic()
+        read = inserted = 0
+        for chunk in importing.batches(rows, chunk_rows):
+            with transaction.atomic():
+                for batch in importing.batches(chunk, options['batch_size']):
+                    inserted += importing.import_batch(kind, batch)
+            read += len(chunk)
+            importing.write_checkpoint(checkpoint, kind, done + read)
+            self.stdout.write(
+                f'Обработано {done + read} строк '
+                f'({self.rate(read, started):.0f} строк/с)'
+            )
+
+        importing.reset_sequences(kind)
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if not options['skip_rebuild']:
+            importing.rebuild_derived(
+                posts=kind == 'posts',
+                follows=kind == 'follows',
+                stdout=self.stdout
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: прочитано {read}, записано {inserted}, '
+            f'{self.rate(read, started):.0f} строк/с'
+        ))
+
+    @staticmethod
+    def rate(rows, started):
+        return rows / max(time.monotonic() - started, 1e-6)
@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает все маршруты posts через WSGI-приложение и сохраняет '
+        'p50/p95/p99, пропускную способность и число SQL-запросов в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='Файл отчёта (- — вывести в stdout)'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на каждый маршрут'
+        )
+        parser.add_argument(
+            '--clients', type=int, default=8,
+            help='Параллельных клиентов'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='Неучитываемых запросов перед замером'
+        )
+        parser.add_argument(
+            '--user', default=f'{benchmark.PREFIX}0',
+            help='Пользователь для маршрутов, требующих входа'
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--only', nargs='*',
+            help='Имена маршрутов, которые нужно замерить'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['clients'] < 1:
+            raise CommandError('Число запросов и клиентов должно быть > 0')
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["user"]} не найден, '
+                'запустите seed_dataset'
+            )
+        try:
+            report = benchmark.run_benchmark(
+                user,
+                requests=options['requests'],
+                clients=options['clients'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                only=options['only'],
+                cold=options['cold'],
+                stdout=self.stdout,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        data = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+        if options['output'] == '-':
+            self.stdout.write(data)
+            return
+        with open(options['output'], 'w', encoding='utf-8') as target:
+            target.write(data + '\n')
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчёт сохранён в {options["output"]}'
+        ))
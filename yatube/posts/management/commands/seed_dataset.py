@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+def dataset_size(value):
+    if value in benchmark.SIZES:
+        return benchmark.SIZES[value]
+    return int(value)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу детерминированным набором данных для бенчмарка: '
+        'small — 10 тыс., medium — 1 млн, large — 10 млн постов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'size', type=dataset_size,
+            help='small, medium, large или число постов'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Строк в одной транзакции'
+        )
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='Сначала удалить ранее загруженный набор'
+        )
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            deleted = benchmark.flush_dataset()[0]
+            self.stdout.write(f'Удалено записей: {deleted}')
+        try:
+            shape = benchmark.seed_dataset(
+                options['size'], options['seed'], options['batch_size'],
+                stdout=self.stdout
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        self.stdout.write(self.style.SUCCESS(
+            'Набор данных загружен: ' + ', '.join(
+                f'{name} {value}' for name, value in shape.items()
+            )
+        ))
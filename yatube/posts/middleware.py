@@ -0,0 +1,13 @@
+THUMBNAIL_LOOKUPS_HEADER = 'X-Thumbnail-Lookups-Saved'
+
+
+class ThumbnailLookupStatsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        saved = getattr(request, 'thumbnail_lookups_saved', None)
+        if saved is not None:
+            response[THUMBNAIL_LOOKUPS_HEADER] = str(saved)
+        return response
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def collect_statistics(apps, schema_editor):
+    # Первая статистика для table_estimate; дальше её обновляют команда
+    # analyze и rebuild_derived.
+    schema_editor.execute('ANALYZE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_dates_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(collect_statistics, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,18 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 
 User = get_user_model()
 
 
 class Post(models.Model):
     text = models.TextField(verbose_name='Текст поста')
+    # default, а не auto_now_add: импорт и генератор данных сохраняют
+    # bulk_create-ом даты из источника.
     pub_date = models.DateTimeField(verbose_name='Дата публикации',
-                                    auto_now_add=True)
+                                    default=timezone.now, editable=False)
+    updated = models.DateTimeField(verbose_name='Дата изменения',
+                                   auto_now=True)
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
@@ -27,11 +32,27 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        verbose_name='Количество комментариев',
+        default=0,
+        editable=False
+    )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=('pub_date', 'id'), name='post_pub_date_idx'),
+            models.Index(
+                fields=('author', 'pub_date', 'id'),
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('group', 'pub_date', 'id'),
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -41,6 +62,11 @@ class Group(models.Model):
     title = models.CharField(verbose_name='Название группы', max_length=200)
     slug = models.SlugField(max_length=100, unique=True)
     description = models.TextField(verbose_name='Описание группы')
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -65,12 +91,18 @@ class Comment(models.Model):
     )
     text = models.TextField(verbose_name='Текст комментария')
     created = models.DateTimeField(verbose_name='Дата публикации комментария',
-                                   auto_now_add=True)
+                                   default=timezone.now, editable=False)
 
     class Meta:
-        ordering = ('created',)
+        ordering = ('created', 'id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', 'created', 'id'),
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -96,3 +128,93 @@ class Follow(models.Model):
                 fields=("user", "author"), name="unique_user_follow_author"
             )
         ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(
+        verbose_name='Количество постов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Количество подписок',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', 'pub_date', 'post'),
+                name='feed_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=('user', 'author'), name='feed_user_author_idx'
+            ),
+        ]
+
+
+class Thumbnail(models.Model):
+    """Готовая миниатюра картинки поста. Пишется задачей генерации,
+    страницы только читают её и не запускают генерацию сами."""
+    source = models.CharField(verbose_name='Картинка', max_length=255)
+    size = models.CharField(verbose_name='Размер', max_length=20)
+    url = models.CharField(verbose_name='Адрес миниатюры', max_length=500)
+
+    class Meta:
+        verbose_name = 'Миниатюра'
+        verbose_name_plural = 'Миниатюры'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('source', 'size'), name='unique_thumbnail_size'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.source} ({self.size})'
@@ -0,0 +1,140 @@
+import re
+
+from django.db import connection
+
+from core.paginators import BACKWARD, LAST, CursorPaginator
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_query(text):
+    # Каждое слово берётся в кавычки, чтобы пользовательский ввод не
+    # разбирался как синтаксис FTS5 (AND, NEAR, * и т.п.).
+    return ' '.join(f'"{word}"' for word in WORD.findall(text))
+
+
+def index_post(post):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.id])
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.id, post.text]
+        )
+
+
+def unindex_post(post_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild_index():
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            f'SELECT id, text FROM posts_post'
+        )
+
+
+def filter_matching(queryset, text):
+    query = match_query(text)
+    if not query:
+        return queryset.none()
+    if not fts_available():
+        for word in WORD.findall(text):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset
+    # pk__in=RawSQL(...) дал бы IN ((SELECT ...)), а SQLite считает такой
+    # подзапрос скалярным и берёт из него только первую строку.
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        where=[
+            f'{table}.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[query]
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсор по паре (релевантность bm25, id): страницы выдачи
+    упорядочены по рангу и не сдвигаются при добавлении постов."""
+
+    def __init__(self, text, per_page, group=None, author=None):
+        super().__init__(
+            Post.objects.select_related('author', 'group'),
+            per_page,
+            ordering=('score', 'id')
+        )
+        self.query = match_query(text)
+        self.group = group
+        self.author = author
+
+    def parse_key(self, name, value):
+        if name == 'score':
+            return float(value)
+        return int(value)
+
+    def _ranked(self, direction, values, limit, offset=0):
+        """Пары (id, score) выдачи в порядке курсора."""
+        if not self.query:
+            return []
+        descending = direction in (BACKWARD, LAST)
+        order = 'DESC' if descending else 'ASC'
+        op = '<' if descending else '>'
+        where = [f'{FTS_TABLE} MATCH %s']
+        params = [self.query]
+        if self.group is not None:
+            where.append('p.group_id = %s')
+            params.append(self.group.id)
+        if self.author is not None:
+            where.append('p.author_id = %s')
+            params.append(self.author.id)
+        seek = ''
+        if values is not None:
+            seek = f'WHERE score {op} %s OR (score = %s AND id {op} %s)'
+            params.extend([values[0], values[0], values[1]])
+        params.extend([limit, offset])
+        sql = (
+            f'SELECT id, score FROM ('
+            f'SELECT p.id AS id, bm25({FTS_TABLE}) AS score '
+            f'FROM {FTS_TABLE} JOIN posts_post p ON p.id = {FTS_TABLE}.rowid '
+            f'WHERE {" AND ".join(where)}'
+            f') {seek} ORDER BY score {order}, id {order} LIMIT %s OFFSET %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def fetch(self, direction, values, limit, offset=0):
+        scores = dict(self._ranked(direction, values, limit, offset))
+        posts = self.object_list.in_bulk(list(scores))
+        result = []
+        for post_id, score in scores.items():
+            if post_id in posts:
+                posts[post_id].score = score
+                result.append(posts[post_id])
+        return result
+
+
+def search_paginator(text, per_page, group=None, author=None):
+    if fts_available():
+        return SearchPaginator(text, per_page, group=group, author=author)
+    posts = Post.objects.select_related('author', 'group')
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    return CursorPaginator(filter_matching(posts, text), per_page)
@@ -0,0 +1,152 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.versions import bump
+from . import counters, feed, follow_graph, search, tasks
+from .fragments import bump_post_versions
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, raw=False, **kwargs):
+    instance._previous_group_id = None
+    instance._previous_image = None
+    if instance.pk and not raw:
+        previous = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image')
+            .first()
+        )
+        if previous is not None:
+            instance._previous_group_id, instance._previous_image = previous
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user_posts(instance.author_id, 1)
+        counters.bump_group_posts(instance.group_id, 1)
+    elif instance._previous_group_id != instance.group_id:
+        counters.bump_group_posts(instance._previous_group_id, -1)
+        counters.bump_group_posts(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_user_posts(instance.author_id, -1)
+    counters.bump_group_posts(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user_follows(instance.user_id, instance.author_id, 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.bump_user_follows(instance.user_id, instance.author_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def queue_post_thumbnails(sender, instance, raw=False, **kwargs):
+    # Сигнал, а не view: миниатюры нужны и постам из админки и API.
+    if not raw and instance.image.name != instance._previous_image:
+        tasks.queue_thumbnails(instance)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_created_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.fan_out_post.delay(instance.id, key=f'fanout:{instance.id}')
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follow_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        follow_graph.forget(instance.user_id, instance.author_id)
+        if feed.add_follow(instance.user_id, instance.author_id):
+            tasks.backfill_follow.delay(
+                instance.user_id, instance.author_id,
+                key=f'feed-history:{instance.id}'
+            )
+
+
+@receiver(post_delete, sender=Follow)
+def drop_unfollowed_feed(sender, instance, **kwargs):
+    follow_graph.forget(instance.user_id, instance.author_id)
+    if feed.drop_follow(instance.user_id, instance.author_id):
+        tasks.backfill_author.delay(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def bump_saved_post_versions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_post_versions(instance, instance._previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post_versions(sender, instance, **kwargs):
+    bump_post_versions(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_versions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_versions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump('groups', f'group:{instance.id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follower_versions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump(
+            f'follower:{instance.user_id}', f'followers:{instance.author_id}'
+        )
+
+
+@receiver(post_save, sender=User)
+def bump_user_versions(sender, instance, created, raw=False,
+                       update_fields=None, **kwargs):
+    if created or raw or update_fields == frozenset(('last_login',)):
+        return
+    bump('users', f'author:{instance.id}')
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_post(instance.id)
@@ -0,0 +1,40 @@
+from tasks.queue import task
+from . import feed, thumbnails
+from .models import Follow, Post
+
+
+@task(name='posts.generate_thumbnails')
+def generate_thumbnails(post_id):
+    thumbnails.generate_post_thumbnails(post_id)
+
+
+@task(name='posts.backfill_thumbnails')
+def backfill_thumbnails():
+    for post_id in thumbnails.posts_without_thumbnails().iterator():
+        thumbnails.generate_post_thumbnails(post_id)
+
+
+@task(name='posts.fan_out_post')
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        feed.fan_out_post(post)
+
+
+@task(name='posts.backfill_author')
+def backfill_author(author_id):
+    feed.backfill_author(author_id)
+
+
+@task(name='posts.backfill_follow')
+def backfill_follow(user_id, author_id):
+    # Подписку могли отменить, пока задача ждала в очереди.
+    if Follow.objects.filter(user_id=user_id, author_id=author_id).exists():
+        feed.backfill_follow(user_id, author_id)
+
+
+def queue_thumbnails(post):
+    if post.image:
+        generate_thumbnails.delay(
+            post.id, key=f'thumbnails:{post.id}:{post.image.name}'
+        )
@@ -0,0 +1,79 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.routers import reading_from_replica
+from core.versions import get_versions
+from ..models import Thumbnail
+from ..thumbnails import prefetch_thumbnails
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/article.html'
+CARD_THUMBNAIL = 'card'
+CARD_SEPARATOR = '\n<hr>\n'
+
+
+def card_scopes(post):
+    scopes = [f'post:{post.id}', f'author:{post.author_id}']
+    if post.group_id:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
+
+
+def card_key(post, versions, show_group, show_author):
+    stamp = '.'.join(str(versions[scope]) for scope in card_scopes(post))
+    return f'post-card:{post.id}:{stamp}:{int(show_group)}{int(show_author)}'
+
+
+def count_saved_lookups(request, images, round_trips):
+    if request is not None:
+        request.thumbnail_lookups_saved = (
+            getattr(request, 'thumbnail_lookups_saved', 0)
+            + max(len(images) - round_trips, 0)
+        )
+
+
+def card_thumbnail(post, thumbnails):
+    # Выборка из with_thumbnail_urls уже несёт адрес миниатюры.
+    if not hasattr(post, 'thumbnail_url'):
+        return thumbnails.get(post.image.name)
+    return post.thumbnail_url and Thumbnail(
+        source=post.image.name, size=CARD_THUMBNAIL, url=post.thumbnail_url
+    )
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, show_group=False, show_author=False):
+    posts = list(posts)
+    versions = get_versions(
+        {scope for post in posts for scope in card_scopes(post)}
+    )
+    keys = [
+        card_key(post, versions, show_group, show_author) for post in posts
+    ]
+    cards = cache.get_many(keys)
+    missing = [
+        (key, post) for key, post in zip(keys, posts) if key not in cards
+    ]
+    images = [
+        post.image for _, post in missing
+        if post.image and not hasattr(post, 'thumbnail_url')
+    ]
+    thumbnails, round_trips = prefetch_thumbnails(images, CARD_THUMBNAIL)
+    count_saved_lookups(context.get('request'), images, round_trips)
+    rendered = {
+        key: render_to_string(CARD_TEMPLATE, {
+            'post': post,
+            'thumbnail': card_thumbnail(post, thumbnails),
+            'show_group': show_group,
+            'show_author': show_author,
+        })
+        for key, post in missing
+    }
+    if rendered and not reading_from_replica():
+        cache.set_many(rendered, settings.FEED_CACHE_TIMEOUT)
+    cards.update(rendered)
+    return mark_safe(CARD_SEPARATOR.join(cards[key] for key in keys))
@@ -0,0 +1,10 @@
+from django import template
+
+from ..thumbnails import cached_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, size):
+    return cached_thumbnail(image, size)
@@ -8,6 +8,8 @@ class FixturesTestCase(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
+        # Кэш не откатывается вместе с транзакцией предыдущего класса.
+        cache.clear()
         cls.user = User.objects.create_user(username='User1')
         cls.group = Group.objects.create(
             title='Тестовая группа',
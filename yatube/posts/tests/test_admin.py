@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginators import estimated_count, table_estimate
+from core.testing import clear_statistics
+from posts.models import Comment, Group, Post, User
+from .fixtures import FixturesTestCase
+
+
+class AdminChangelistTests(FixturesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(self.admin)
+
+    def add_rows(self, start, stop):
+        for i in range(start, stop):
+            author = User.objects.create_user(username=f'admin-author-{i}')
+            group = Group.objects.create(title=f'Группа {i}', slug=f'g-{i}')
+            post = Post.objects.create(
+                author=author, group=group, text=f'Пост {i}'
+            )
+            Comment.objects.create(post=post, author=author, text=f'К {i}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_query_budget_does_not_grow(self):
+        urls = [
+            reverse('admin:posts_post_changelist'),
+            reverse('admin:posts_comment_changelist'),
+            reverse('admin:posts_post_change', args=(self.post.id,)),
+        ]
+        self.add_rows(0, 2)
+        for url in urls:
+            self.client.get(url)
+        before = {url: self.count_queries(url) for url in urls}
+        self.add_rows(2, 22)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+                self.assertLessEqual(before[url], 12)
+
+    def test_estimated_count_is_bounded(self):
+        self.add_rows(0, 5)
+        posts = Post.objects.filter(text__startswith='Пост')
+        self.assertEqual(estimated_count(posts), 5)
+        self.assertEqual(estimated_count(posts, limit=3), 4)
+
+    @override_settings(ESTIMATED_COUNT_LIMIT=3)
+    def test_large_count_is_estimated_from_statistics(self):
+        self.add_rows(0, 5)
+        self.addCleanup(clear_statistics)
+        call_command('analyze', stdout=StringIO())
+        total = Post.objects.count()
+        self.assertEqual(table_estimate(Post), total)
+        self.assertEqual(estimated_count(Post.objects.all()), total)
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, f'≈</span>{total} ')
+        response = self.client.get(reverse('admin:posts_group_changelist'))
+        self.assertNotContains(response, '≈')
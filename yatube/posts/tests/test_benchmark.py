@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import F
+
+from posts import benchmark
+from posts.models import Follow, Group, Post, User
+from posts.urls import urlpatterns
+from .fixtures import FixturesTestCase
+
+
+class BenchmarkTests(FixturesTestCase):
+    def seed(self, posts=200):
+        call_command('seed_dataset', str(posts), stdout=StringIO())
+
+    def test_dataset_is_deterministic(self):
+        first = benchmark.DatasetGenerator(200, seed=1)
+        second = benchmark.DatasetGenerator(200, seed=1)
+        self.assertEqual(
+            [(post.author_id, post.text) for post in first.posts()],
+            [(post.author_id, post.text) for post in second.posts()]
+        )
+
+    def test_seed_dataset(self):
+        self.seed()
+        shape = benchmark.dataset_shape(200)
+        self.assertEqual(
+            Post.objects.filter(author__username__startswith='bench').count(),
+            200
+        )
+        self.assertEqual(
+            Group.objects.filter(slug__startswith='bench-').count(),
+            shape['groups']
+        )
+        follows = Follow.objects.filter(user__username__startswith='bench')
+        self.assertTrue(follows.exists())
+        self.assertFalse(
+            follows.filter(user_id=F('author_id')).exists()
+        )
+        self.assertTrue(
+            User.objects.get(username='bench0').stats.posts_count
+        )
+
+    def test_seed_twice_requires_flush(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        call_command('seed_dataset', '200', '--flush', stdout=StringIO())
+        self.assertEqual(
+            User.objects.filter(username__startswith='bench').count(),
+            benchmark.dataset_shape(200)['users']
+        )
+
+    def test_run_benchmark_covers_every_url(self):
+        self.seed()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        output = os.path.join(directory, 'report.json')
+        call_command(
+            'run_benchmark', '--requests', '3', '--clients', '1',
+            '--warmup', '0', '--output', output, stdout=StringIO()
+        )
+        with open(output, encoding='utf-8') as source:
+            report = json.load(source)
+        self.assertEqual(
+            set(report['results']),
+            {pattern.name for pattern in urlpatterns}
+        )
+        for name, result in report['results'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['requests'], 3)
+                self.assertEqual(result['errors'], 0)
+                self.assertGreater(result['queries']['mean'], 0)
+                self.assertLessEqual(
+                    result['latency_ms']['p50'], result['latency_ms']['p99']
+                )
+        self.assertEqual(report['dataset']['posts'], Post.objects.count())
+
+    def test_write_targets_leave_dataset_unchanged(self):
+        self.seed()
+        before = benchmark.dataset_counts()
+        report = benchmark.run_benchmark(
+            User.objects.get(username='bench0'), requests=4, clients=1,
+            warmup=1, only={'add_comment', 'profile_follow',
+                            'profile_unfollow'}
+        )
+        for name, result in report['results'].items():
+            with self.subTest(name=name):
+                self.assertEqual(result['errors'], 0)
+        self.assertEqual(benchmark.dataset_counts(), before)
+
+    def test_page_cache_hits_are_reported_separately(self):
+        self.seed()
+        user = User.objects.get(username='bench0')
+        warm = benchmark.run_benchmark(
+            user, requests=4, clients=1, warmup=1, only={'index'}
+        )['results']['index']
+        self.assertEqual(warm['page_cache']['hit']['requests'], 4)
+        cold = benchmark.run_benchmark(
+            user, requests=4, clients=1, warmup=1, only={'index'}, cold=True
+        )['results']['index']
+        self.assertEqual(set(cold['page_cache']), {'miss'})
+        self.assertGreater(
+            cold['page_cache']['miss']['queries_mean'],
+            warm['page_cache']['hit']['queries_mean']
+        )
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 0.5), 50)
+        self.assertEqual(benchmark.percentile(values, 0.99), 99)
+        self.assertEqual(benchmark.percentile([7], 0.95), 7)
@@ -0,0 +1,55 @@
+from django.urls import reverse
+
+from posts.models import Comment, User
+from posts.views import COMMENTS_SHOWN_AMOUNT
+from .fixtures import FixturesTestCase
+
+
+class CommentsPaginationTests(FixturesTestCase):
+    def setUp(self):
+        super().setUp()
+        authors = [
+            User.objects.create_user(username=f'Commenter{i}')
+            for i in range(3)
+        ]
+        self.comments = [
+            Comment.objects.create(
+                post=self.post,
+                author=authors[i % len(authors)],
+                text=f'Комментарий {i}'
+            )
+            for i in range(COMMENTS_SHOWN_AMOUNT + 5)
+        ]
+
+    def test_post_detail_loads_comments_with_authors_in_one_query(self):
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        # Теги кэша страниц, пост и комментарии вместе с авторами.
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(list(comments), self.comments[:COMMENTS_SHOWN_AMOUNT])
+        self.assertTrue(comments.has_next())
+        self.assertContains(
+            response, reverse('posts:post_comments', args=(self.post.id,))
+        )
+
+    def test_load_more_returns_next_page_fragment(self):
+        url = reverse('posts:post_detail', args=(self.post.id,))
+        cursor = self.client.get(url).context['comments'].next_cursor
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.id,)),
+            {'cursor': cursor}
+        )
+        self.assertTemplateUsed(response, 'includes/comments_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            list(response.context['comments']),
+            self.comments[COMMENTS_SHOWN_AMOUNT:]
+        )
+        self.assertFalse(response.context['comments'].has_next())
+
+    def test_load_more_for_missing_post(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=(self.post.id + 100,))
+        )
+        self.assertEqual(response.status_code, 404)
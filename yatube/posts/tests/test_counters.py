@@ -0,0 +1,156 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+from .fixtures import FixturesTestCase
+
+
+class CountersTests(FixturesTestCase):
+    def assertCounters(self, posts_count, group_posts_count,
+                       comments_count):
+        self.assertEqual(
+            UserStats.objects.get(user=self.post.author).posts_count,
+            posts_count
+        )
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count,
+            group_posts_count
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).comments_count,
+            comments_count
+        )
+
+    def test_counters_follow_create_edit_and_delete(self):
+        self.assertCounters(1, 0, 0)
+        post = Post.objects.create(
+            author=self.post.author, group=self.group, text='Текст'
+        )
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        self.assertCounters(2, 1, 1)
+        post.group = None
+        post.save()
+        self.assertCounters(2, 0, 1)
+        post.delete()
+        comment.delete()
+        self.assertCounters(1, 0, 0)
+
+    def test_counters_do_not_drop_below_zero(self):
+        post = Post.objects.create(
+            author=self.post.author, group=self.group, text='Текст'
+        )
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.user, author=self.post.author)
+        # Счётчики, заведённые до rebuild_counters.
+        UserStats.objects.update(
+            posts_count=0, followers_count=0, following_count=0
+        )
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=0)
+        post.delete()
+        comment.delete()
+        follow.delete()
+        self.assertCounters(0, 0, 0)
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(stats.following_count, 0)
+
+    def test_rebuild_counters_command(self):
+        Post.objects.create(
+            author=self.post.author, group=self.group, text='Текст'
+        )
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        UserStats.objects.update(posts_count=0)
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=0)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters(2, 1, 1)
+
+    def test_post_edit_keeps_comment_counter(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.post_author.post(
+                reverse('posts:post_edit', args=(self.post.id,)),
+                {'text': 'Исправленный текст'}
+            )
+        updates = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('UPDATE "posts_post"')
+        ]
+        self.assertTrue(updates)
+        for sql in updates:
+            self.assertNotIn('"comments_count"', sql)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).text, 'Исправленный текст'
+        )
+
+    def test_profile_reads_stored_counter(self):
+        UserStats.objects.filter(user=self.post.author).update(posts_count=42)
+        response = self.client.get(
+            reverse('posts:profile', args=(self.post.author.username,))
+        )
+        self.assertContains(response, 'Всего постов: 42')
+
+    def test_follow_counters(self):
+        author = self.post.author
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(author.username,))
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=author).followers_count, 1
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 1
+        )
+        UserStats.objects.update(followers_count=0, following_count=0)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=author).followers_count, 1
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(author.username,))
+        )
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).following_count, 0
+        )
+
+    @override_settings(SINGLE_PROCESS=True)
+    def test_profile_header_and_page_take_two_queries(self):
+        author = self.post.author
+        Follow.objects.create(user=self.user, author=author)
+        url = reverse('posts:profile', args=(author.username,))
+        # Главная прогревает сессию и пользователя в кэше.
+        self.authorized_client.get(reverse('posts:index'))
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Подписчиков: 1')
+
+    def test_cached_profile_header_follows_counter_changes(self):
+        author = self.post.author
+        url = reverse('posts:profile', args=(author.username,))
+        # Разные адреса минуют кэш страниц: шапку читает каждый запрос.
+        # Первый промах только запоминает id автора, второй кэширует шапку.
+        for visit in range(2):
+            self.assertContains(
+                self.client.get(url, {'visit': visit}), 'Подписчиков: 0'
+            )
+        with self.assertNumQueries(1):
+            self.client.get(url, {'visit': 2})
+        Follow.objects.create(user=self.user, author=author)
+        self.assertContains(
+            self.client.get(url, {'visit': 3}), 'Подписчиков: 1'
+        )
+        Post.objects.create(author=author, text='Ещё пост')
+        self.assertContains(
+            self.client.get(url, {'visit': 4}), 'Всего постов: 2'
+        )
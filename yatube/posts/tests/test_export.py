@@ -0,0 +1,65 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+from .fixtures import FixturesTestCase
+
+
+def read_jsonl(content):
+    return [json.loads(line) for line in content.decode().splitlines()]
+
+
+class ExportDataTests(FixturesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.own_post = Post.objects.create(
+            author=self.user, text='Мой пост', image='posts/own.gif'
+        )
+        Comment.objects.create(post=self.post, author=self.user, text='Мой')
+        Follow.objects.create(user=self.user, author=self.__class__.user)
+        self.url = reverse('posts:export_data')
+
+    def test_user_export_contains_only_own_data(self):
+        response = self.authorized_client.get(self.url)
+        self.assertTrue(response.streaming)
+        rows = read_jsonl(b''.join(response.streaming_content))
+        self.assertEqual(
+            [row['type'] for row in rows],
+            ['users', 'posts', 'comments', 'follows']
+        )
+        post = rows[1]
+        self.assertEqual(post['id'], self.own_post.id)
+        self.assertEqual(post['image'], 'posts/own.gif')
+        self.assertEqual(post['image_url'], '/media/posts/own.gif')
+        self.assertNotIn('password', rows[0])
+
+    def test_gzip_export(self):
+        response = self.authorized_client.get(self.url, {'gzip': 1})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(read_jsonl(content)), 4)
+
+    def test_site_export_requires_staff(self):
+        response = self.authorized_client.get(self.url, {'scope': 'site'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_exports_whole_site(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'site.jsonl.gz')
+        self.addCleanup(os.rmdir, directory)
+        self.addCleanup(os.remove, path)
+        call_command(
+            'export_data', '--output', path, '--gzip', '--with-passwords',
+            '--chunk-size', '1'
+        )
+        with gzip.open(path) as source:
+            rows = read_jsonl(source.read())
+        types = [row['type'] for row in rows]
+        self.assertEqual(types.count('posts'), 2)
+        self.assertEqual(types.count('groups'), 1)
+        self.assertIn('password', rows[0])
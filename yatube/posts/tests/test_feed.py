@@ -0,0 +1,132 @@
+from array import array
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import FeedEntry, Follow, Post, User
+from posts.views import POSTS_SHOWN_AMOUNT
+from .fixtures import FixturesTestCase
+
+
+class FollowFeedTests(FixturesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.celebrity = User.objects.create_user(username='Celebrity')
+
+    def feed(self, client=None, cursor=None):
+        response = (client or self.authorized_client).get(
+            reverse('posts:follow_index'),
+            {'cursor': cursor} if cursor else None
+        )
+        return response.context['page_obj']
+
+    def test_follow_backfills_and_unfollow_drops_entries(self):
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.post.author.username,))
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=self.post).exists()
+        )
+        self.assertEqual(list(self.feed()), [self.post])
+        self.authorized_client.get(
+            reverse(
+                'posts:profile_unfollow', args=(self.post.author.username,)
+            )
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(list(self.feed()), [])
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.post.author)
+        self.feed()
+        self.post_author.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        new_post = Post.objects.get(text='Новый пост')
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=new_post).exists()
+        )
+        self.assertEqual(self.feed()[0], new_post)
+        self.assertContains(
+            self.authorized_client.get(reverse('posts:follow_index')),
+            new_post.text
+        )
+
+    @override_settings(TASKS_EAGER=False)
+    def test_fan_out_runs_in_task_worker(self):
+        Follow.objects.create(user=self.user, author=self.post.author)
+        new_post = Post.objects.create(author=self.post.author, text='Позже')
+        self.assertFalse(FeedEntry.objects.filter(post=new_post).exists())
+        call_command('process_tasks', once=True, workers=0, stdout=StringIO())
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=new_post).exists()
+        )
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_celebrity_posts_are_pulled_on_read(self):
+        Follow.objects.create(user=self.user, author=self.celebrity)
+        Follow.objects.create(user=self.post.author, author=self.celebrity)
+        Follow.objects.create(user=self.user, author=self.post.author)
+        for i in range(POSTS_SHOWN_AMOUNT):
+            Post.objects.create(author=self.celebrity, text=f'Пост {i}')
+        self.assertFalse(
+            FeedEntry.objects.filter(author=self.celebrity).exists()
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(author=self.post.author).exists()
+        )
+        expected = list(
+            Post.objects.filter(author__in=(self.celebrity, self.post.author))
+        )
+        page_obj = self.feed()
+        shown = list(page_obj)
+        while page_obj.has_next():
+            page_obj = self.feed(cursor=page_obj.next_cursor)
+            shown.extend(page_obj)
+        self.assertEqual(shown, expected)
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_former_celebrity_posts_are_backfilled(self):
+        Follow.objects.create(user=self.user, author=self.celebrity)
+        Follow.objects.create(user=self.post.author, author=self.celebrity)
+        post = Post.objects.create(author=self.celebrity, text='Звёздный')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.post_author.get(
+            reverse('posts:profile_unfollow', args=(self.celebrity.username,))
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(FEED_BACKFILL_POSTS=2, TASKS_EAGER=False)
+    def test_follow_backfills_whole_history_in_task(self):
+        for i in range(4):
+            Post.objects.create(author=self.post.author, text=f'Пост {i}')
+        history = list(Post.objects.filter(author=self.post.author))
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.post.author.username,))
+        )
+        self.assertEqual(list(self.feed()), history[:2])
+        call_command('process_tasks', once=True, workers=0, stdout=StringIO())
+        self.assertEqual(list(self.feed()), history)
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+    def test_crossing_fanout_limit_resets_cached_follower_counts(self):
+        Follow.objects.create(user=self.user, author=self.celebrity)
+        self.feed()
+        # Число подписчиков, закэшированное другим процессом до подписки.
+        cache.set(
+            follow_graph.followers_key()(self.celebrity.id),
+            array(follow_graph.TYPECODE, [self.user.id])
+        )
+        self.post_author.get(
+            reverse('posts:profile_follow', args=(self.celebrity.username,))
+        )
+        post = Post.objects.create(author=self.celebrity, text='Звёздный')
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(self.feed()), [post])
@@ -0,0 +1,104 @@
+from array import array
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.feed import fan_out_post
+from posts.models import FeedEntry, Follow, Post, User
+from .fixtures import FixturesTestCase
+
+
+class FollowGraphTests(FixturesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = self.__class__.user
+        self.others = [
+            User.objects.create_user(username=f'Reader{number}')
+            for number in range(3)
+        ]
+
+    def test_sets_are_sorted_arrays_served_from_cache(self):
+        for reader in reversed(self.others):
+            Follow.objects.create(user=reader, author=self.author)
+        followers = follow_graph.followers(self.author.id)
+        self.assertIsInstance(followers, array)
+        self.assertEqual(
+            list(followers), sorted(reader.id for reader in self.others)
+        )
+        follow_graph.followees_of([self.others[0].id, self.user.id])
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follow_graph.is_following(self.others[0].id, self.author.id)
+            )
+            self.assertFalse(
+                follow_graph.is_following(self.user.id, self.author.id)
+            )
+            self.assertEqual(
+                follow_graph.follower_counts([self.author.id]),
+                {self.author.id: 3}
+            )
+
+    def test_follow_and_unfollow_refresh_both_sets(self):
+        self.assertEqual(len(follow_graph.followees(self.user.id)), 0)
+        self.assertEqual(len(follow_graph.followers(self.author.id)), 0)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertEqual(
+            list(follow_graph.followees(self.user.id)), [self.author.id]
+        )
+        self.assertEqual(
+            list(follow_graph.followers(self.author.id)), [self.user.id]
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(
+            follow_graph.is_following(self.user.id, self.author.id)
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=2)
+    def test_celebrity_followers_are_cached_as_count(self):
+        for reader in self.others:
+            Follow.objects.create(user=reader, author=self.author)
+        self.assertIsNone(follow_graph.followers(self.author.id))
+        self.assertEqual(
+            follow_graph.follower_counts([self.author.id]),
+            {self.author.id: 3}
+        )
+
+    def stale_graph(self, followers, followees):
+        # Так кэш видит другой процесс, до которого не дошёл forget().
+        cache.set(
+            follow_graph.followers_key()(self.author.id),
+            array(follow_graph.TYPECODE, followers)
+        )
+        cache.set(
+            follow_graph.FOLLOWEES_KEY.format(self.user.id),
+            array(follow_graph.TYPECODE, followees)
+        )
+
+    def test_writes_ignore_stale_cached_sets(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        self.stale_graph(followers=(), followees=())
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        fan_out_post(post)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=(self.author.username,))
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.stale_graph(
+            followers=(self.user.id,), followees=(self.author.id,)
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertTrue(
+            Follow.objects.filter(user=self.user, author=self.author).exists()
+        )
@@ -0,0 +1,122 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+
+from core.testing import clear_statistics
+
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from posts.search import filter_matching
+from .fixtures import FixturesTestCase
+
+
+class ImportDataTests(FixturesTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.addCleanup(clear_statistics)
+
+    def write_jsonl(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            for row in rows:
+                target.write(json.dumps(row, ensure_ascii=False) + '\n')
+        return path
+
+    def write_csv(self, name, rows):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', newline='', encoding='utf-8') as target:
+            writer = csv.DictWriter(target, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def run_import(self, *args):
+        output = StringIO()
+        call_command(
+            'import_data', *args, '--batch-size', '2',
+            '--batches-per-transaction', '2', stdout=output
+        )
+        return output.getvalue()
+
+    def test_full_import(self):
+        self.run_import('users', self.write_jsonl('users.jsonl', [
+            {'username': f'imported{i}', 'first_name': f'Имя{i}'}
+            for i in range(5)
+        ]))
+        self.run_import('groups', self.write_csv('groups.csv', [
+            {'title': 'Импорт', 'slug': 'imported', 'description': 'Группа'},
+        ]))
+        output = self.run_import('posts', self.write_jsonl('posts.jsonl', [
+            {
+                'id': 1000 + i,
+                'author': f'imported{i % 2}',
+                'group': 'imported' if i % 2 else '',
+                'text': f'импортированный пост {i}',
+                'pub_date': f'2015-01-0{i + 1}T10:00:00',
+            }
+            for i in range(5)
+        ]))
+        self.assertIn('строк/с', output)
+        self.run_import('comments', self.write_csv('comments.csv', [
+            {'post': 1000 + i, 'author': 'imported4', 'text': f'к {i}',
+             'created': '2016-02-01T00:00:00Z'}
+            for i in range(3)
+        ] + [{'post': 999999, 'author': 'imported4', 'text': 'сирота',
+              'created': ''}]))
+        follows = [
+            {'user': 'imported3', 'author': 'imported0'},
+            {'user': 'imported3', 'author': 'imported0'},
+            {'user': 'imported3', 'author': 'imported3'},
+            {'user': 'imported3', 'author': 'imported1'},
+        ]
+        path = self.write_jsonl('follows.jsonl', follows)
+        self.assertIn('записано 2,', self.run_import('follows', path))
+        # Повторный импорт ничего не пишет: дубли пропущены.
+        self.assertIn(
+            'записано 0,', self.run_import('follows', path, '--restart')
+        )
+
+        post = Post.objects.get(id=1000)
+        self.assertEqual(
+            post.pub_date, datetime(2015, 1, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            Comment.objects.get(post=post).created,
+            datetime(2016, 2, 1, tzinfo=timezone.utc)
+        )
+        self.assertFalse(Comment.objects.filter(text='сирота').exists())
+        self.assertEqual(Group.objects.get(slug='imported').posts_count, 2)
+        author = User.objects.get(username='imported0')
+        self.assertEqual(author.stats.posts_count, 3)
+        self.assertEqual(
+            Follow.objects.filter(user__username='imported3').count(), 2
+        )
+        self.assertEqual(
+            FeedEntry.objects.filter(user__username='imported3').count(), 5
+        )
+        self.assertEqual(
+            filter_matching(Post.objects.all(), 'импортированный').count(), 5
+        )
+
+    def test_resumes_from_checkpoint(self):
+        path = self.write_jsonl('users.jsonl', [
+            {'username': f'resumed{i}'} for i in range(3)
+        ])
+        with open(f'{path}.checkpoint', 'w') as target:
+            json.dump({'kind': 'users', 'rows': 1}, target)
+        output = self.run_import('users', path)
+        self.assertIn('пропущено: 1', output)
+        self.assertEqual(
+            sorted(User.objects.filter(username__startswith='resumed')
+                   .values_list('username', flat=True)),
+            ['resumed1', 'resumed2']
+        )
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
@@ -0,0 +1,75 @@
+from unittest import mock
+
+from django.shortcuts import render
+from django.urls import reverse
+
+from core.middleware import CACHE_HEADER
+from posts.models import Comment, Post
+from .fixtures import FixturesTestCase
+
+
+class AnonymousPageCacheTests(FixturesTestCase):
+    def test_anonymous_pages_are_cached(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.post.author.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                second = self.client.get(url)
+                self.assertEqual(first[CACHE_HEADER], 'MISS')
+                self.assertEqual(second[CACHE_HEADER], 'HIT')
+                self.assertEqual(first.content, second.content)
+
+    def test_query_string_is_part_of_the_key(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        response = self.client.get(url, {'cursor': 'other'})
+        self.assertEqual(response[CACHE_HEADER], 'MISS')
+
+    def test_authorized_requests_skip_cache(self):
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertNotIn(CACHE_HEADER, response)
+
+    def test_changes_purge_tagged_pages(self):
+        detail_url = reverse('posts:post_detail', args=(self.post.id,))
+        index_url = reverse('posts:index')
+        self.client.get(detail_url)
+        self.client.get(index_url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+        response = self.client.get(detail_url)
+        self.assertEqual(response[CACHE_HEADER], 'MISS')
+        self.assertContains(response, 'Новый комментарий')
+        self.assertEqual(self.client.get(index_url)[CACHE_HEADER], 'HIT')
+        Post.objects.create(author=self.user, text='Свежий пост')
+        response = self.client.get(index_url)
+        self.assertEqual(response[CACHE_HEADER], 'MISS')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_change_during_render_is_not_cached_as_current(self):
+        url = reverse('posts:index')
+
+        def render_then_change(*args, **kwargs):
+            response = render(*args, **kwargs)
+            Post.objects.create(author=self.user, text='Свежий пост')
+            return response
+
+        with mock.patch('posts.views.render', render_then_change):
+            response = self.client.get(url)
+        self.assertNotContains(response, 'Свежий пост')
+        response = self.client.get(url)
+        self.assertEqual(response[CACHE_HEADER], 'MISS')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_head_requests_are_not_cached(self):
+        url = reverse('posts:index')
+        response = self.client.head(url)
+        self.assertNotIn(CACHE_HEADER, response)
+        self.assertEqual(self.client.get(url)[CACHE_HEADER], 'MISS')
@@ -0,0 +1,149 @@
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.paginators import GAP, CursorPaginator
+from core.testing import clear_statistics
+from posts.counters import rebuild_counters
+from posts.models import Post
+from posts.views import POSTS_SHOWN_AMOUNT
+from .fixtures import FixturesTestCase
+
+GROUP_POSTS = 79
+
+
+@override_settings(PAGINATION_WINDOW=2)
+class PageLinksTests(FixturesTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Пост {number}')
+            for number in range(GROUP_POSTS)
+        )
+        rebuild_counters()
+        cls.posts = list(
+            Post.objects.filter(group=cls.group).order_by('-pub_date', '-id')
+        )
+
+    def paginator(self, count=GROUP_POSTS):
+        return CursorPaginator(
+            Post.objects.filter(group=self.group), POSTS_SHOWN_AMOUNT,
+            count=count
+        )
+
+    def numbers(self, page):
+        return [link.number for link in page.page_links if link != GAP]
+
+    def test_first_page_links(self):
+        page = self.paginator().page()
+        self.assertEqual(page.number, 1)
+        self.assertEqual(self.numbers(page), [1, 2, 3, 8])
+        self.assertIn(GAP, page.page_links)
+        self.assertTrue(page.page_links[0].current)
+
+    def test_numbered_cursor_opens_its_page(self):
+        paginator = self.paginator()
+        link = paginator.page().page_links[2]
+        page = paginator.page(link.cursor)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(
+            page.object_list,
+            self.posts[2 * POSTS_SHOWN_AMOUNT:3 * POSTS_SHOWN_AMOUNT]
+        )
+        self.assertEqual(self.numbers(page), [1, 2, 3, 4, 5, 8])
+
+    def test_last_page_number_comes_from_count(self):
+        paginator = self.paginator()
+        page = paginator.page(paginator.page().last_cursor)
+        self.assertEqual(page.number, 8)
+        self.assertFalse(page.has_next())
+        self.assertEqual(self.numbers(page), [1, 6, 7, 8])
+        # Последняя страница — остаток, как при листании вперёд.
+        tail = (GROUP_POSTS // POSTS_SHOWN_AMOUNT) * POSTS_SHOWN_AMOUNT
+        self.assertEqual(page.object_list, self.posts[tail:])
+        page = paginator.page(page.previous_cursor)
+        self.assertEqual(page.number, 7)
+        self.assertEqual(
+            page.object_list,
+            self.posts[tail - POSTS_SHOWN_AMOUNT:tail]
+        )
+
+    def test_every_link_opens_its_page_from_one_query(self):
+        for count in (GROUP_POSTS, None):
+            paginator = self.paginator(count=count)
+            seen, cursors = {''}, ['']
+            while cursors:
+                page = paginator.page(cursors.pop())
+                if page.number is None:
+                    continue
+                # Ссылки окна строятся из того же запроса, что и страница.
+                with self.assertNumQueries(1):
+                    links = page.page_links
+                start = (page.number - 1) * POSTS_SHOWN_AMOUNT
+                with self.subTest(count=count, number=page.number):
+                    self.assertEqual(
+                        page.object_list,
+                        self.posts[start:start + POSTS_SHOWN_AMOUNT]
+                    )
+                for link in links:
+                    if link.cursor is not None and link.cursor not in seen:
+                        seen.add(link.cursor)
+                        cursors.append(link.cursor)
+            self.assertGreater(len(seen), GROUP_POSTS // POSTS_SHOWN_AMOUNT)
+
+    def test_last_link_without_count_has_no_number(self):
+        for count in (None, 0):
+            with self.subTest(count=count):
+                page = self.paginator(count=count).page()
+                self.assertEqual(page.page_links[-1].number, None)
+                self.assertEqual(
+                    page.page_links[-1].cursor, page.last_cursor
+                )
+
+    def test_group_page_renders_links_without_count_query(self):
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'].upper() for query in queries
+        ))
+        page = response.context['page_obj']
+        self.assertEqual(self.numbers(page), [1, 2, 3, 8])
+        response = self.client.get(url, {'cursor': page.page_links[-1].cursor})
+        self.assertEqual(response.context['page_obj'].number, 8)
+        self.assertContains(response, 'aria-current="page"')
+
+    @override_settings(ESTIMATED_COUNT_LIMIT=5)
+    def test_index_last_page_is_numbered_only_from_statistics(self):
+        url = reverse('posts:index')
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'].upper() for query in queries
+        ))
+        self.assertEqual(
+            response.context['page_obj'].page_links[-1].number, None
+        )
+
+        call_command('analyze')
+        self.addCleanup(clear_statistics)
+        cache.clear()
+        total = Post.objects.count()
+        pages = -(-total // POSTS_SHOWN_AMOUNT)
+        page = self.client.get(url).context['page_obj']
+        self.assertEqual(page.page_links[-1].number, pages)
+        page = self.client.get(
+            url, {'cursor': page.last_cursor}
+        ).context['page_obj']
+        self.assertEqual(page.number, pages)
+        self.assertEqual(
+            list(page),
+            list(Post.objects.order_by('-pub_date', '-id'))[
+                (pages - 1) * POSTS_SHOWN_AMOUNT:
+            ]
+        )
@@ -0,0 +1,43 @@
+from unittest import mock
+
+from posts.models import Post
+from posts.templatetags.post_cards import post_cards
+from .fixtures import FixturesTestCase
+
+
+class PostCardsTests(FixturesTestCase):
+    def test_cards_are_reused_until_post_changes(self):
+        post = Post.objects.get(id=self.post.id)
+        first = post_cards({}, [post], show_author=True)
+        self.assertIn(post.text, first)
+        post.text = 'Несохранённый текст'
+        self.assertEqual(post_cards({}, [post], show_author=True), first)
+        post.save()
+        self.assertIn(post.text, post_cards({}, [post], show_author=True))
+
+    def test_cards_depend_on_display_flags(self):
+        post = Post.objects.select_related('author').get(id=self.post.id)
+        self.assertIn(
+            post.author.username, post_cards({}, [post], show_author=True)
+        )
+        self.assertNotIn(
+            post.author.username, post_cards({}, [post], show_author=False)
+        )
+
+    def test_author_rename_invalidates_cards(self):
+        post = Post.objects.select_related('author').get(id=self.post.id)
+        post_cards({}, [post], show_author=True)
+        post.author.first_name = 'Новое'
+        post.author.last_name = 'Имя'
+        post.author.save()
+        self.assertIn('Новое Имя', post_cards({}, [post], show_author=True))
+
+    def test_cards_read_from_replica_are_not_cached(self):
+        post = Post.objects.get(id=self.post.id)
+        with mock.patch(
+            'posts.templatetags.post_cards.reading_from_replica',
+            return_value=True
+        ):
+            post_cards({}, [post])
+        post.text = 'Несохранённый текст'
+        self.assertIn(post.text, post_cards({}, [post]))
@@ -0,0 +1,276 @@
+import shutil
+import tempfile
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import override_settings
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts.models import Comment, Follow, Group, Post, Thumbnail, User
+from posts.urls import urlpatterns
+from posts.views import COMMENTS_SHOWN_AMOUNT, POSTS_SHOWN_AMOUNT
+from .fixtures import FixturesTestCase
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+AUTHORS = 4
+# Несколько страниц на автора: в профиле есть и середина, и хвост.
+AUTHOR_POSTS = 3 * POSTS_SHOWN_AMOUNT + 5
+COMMENTS = 2 * COMMENTS_SHOWN_AMOUNT + 5
+
+
+# Худший путь: задачи ставятся в очередь, как в продакшене, подписка
+# оставляет историю фоновой задаче, а первый автор — знаменитость, чьи
+# посты лента подтягивает при чтении.
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    TASKS_EAGER=False,
+    FEED_BACKFILL_POSTS=POSTS_SHOWN_AMOUNT,
+    FEED_FANOUT_MAX_FOLLOWERS=1,
+)
+class QueryBudgetTests(QueryBudgetMixin, FixturesTestCase):
+    """Каждая view прогоняется по всем своим страницам на выдаче с
+    разными авторами, группами, комментаторами и картинками, анонимом и
+    вошедшим пользователем: N+1 по любой связи сразу выходит за бюджет."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {number}', slug=f'group-{number}',
+                description='Описание'
+            )
+            for number in range(3)
+        ]
+        cls.authors = cls.add_authors('Author')
+        cls.group = cls.groups[0]
+        cls.last_post = Post.objects.filter(
+            author=cls.authors[0]
+        ).exclude(image='').latest('pub_date')
+        cls.add_comments(cls.last_post, cls.authors, 'Комментарий')
+        # Второй подписчик делает первого автора знаменитостью.
+        Follow.objects.create(user=cls.user, author=cls.authors[0])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def add_authors(cls, prefix):
+        """Авторы с несколькими страницами постов; у каждого второго
+        поста картинка, у части картинок уже есть миниатюры."""
+        authors = [
+            User.objects.create_user(username=f'{prefix}{number}')
+            for number in range(AUTHORS)
+        ]
+        for number in range(AUTHORS * AUTHOR_POSTS):
+            turn = number // AUTHORS
+            image = f'posts/{prefix}{number}.gif' if turn % 2 else ''
+            Post.objects.create(
+                author=authors[number % AUTHORS],
+                group=cls.groups[number % len(cls.groups)],
+                text=f'Пост номер {number} про бюджеты',
+                image=image,
+            )
+            if turn % 4 == 1:
+                for size in settings.POST_THUMBNAILS:
+                    Thumbnail.objects.create(
+                        source=image, size=size, url=f'/{size}/{image}'
+                    )
+        return authors
+
+    @classmethod
+    def add_comments(cls, post, authors, text):
+        for number in range(COMMENTS):
+            Comment.objects.create(
+                post=post, author=authors[number % len(authors)],
+                text=f'{text} {number}'
+            )
+
+    def setUp(self):
+        super().setUp()
+        # На последнего автора подписывается profile_follow.
+        for author in self.authors[:-1]:
+            Follow.objects.create(user=self.user, author=author)
+
+    def grow(self):
+        """Добавляет столько же авторов, постов, комментариев и подписок,
+        сколько было: число запросов view от этого меняться не должно."""
+        authors = self.add_authors('Extra')
+        self.add_comments(self.last_post, authors, 'Ещё комментарий')
+        for author in authors:
+            Follow.objects.create(user=self.user, author=author)
+
+    def upload(self):
+        return SimpleUploadedFile(
+            name='budget.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+
+    def listings(self):
+        """Просмотры с постраничной выдачей: (имя, адрес, нужен ли вход)."""
+        post_id = self.last_post.id
+        return (
+            ('index', reverse('posts:index'), False),
+            ('group_list', reverse(
+                'posts:group_list', args=(self.group.slug,)
+            ), False),
+            ('profile', reverse(
+                'posts:profile', args=(self.authors[0],)
+            ), False),
+            ('post_detail', reverse(
+                'posts:post_detail', args=(post_id,)
+            ), False),
+            ('post_comments', reverse(
+                'posts:post_comments', args=(post_id,)
+            ), False),
+            ('search', reverse('posts:search') + '?q=бюджеты', False),
+            ('follow_index', reverse('posts:follow_index'), True),
+        )
+
+    def actions(self):
+        """Остальные view: (имя, адрес, клиент, метод, данные)."""
+        post = self.__class__.post
+        other_group = self.groups[1]
+        yield (
+            'post_create', reverse('posts:post_create'),
+            self.authorized_client, 'get', None
+        )
+        yield (
+            'post_create', reverse('posts:post_create'),
+            self.authorized_client, 'post',
+            {'text': 'Новый', 'group': other_group.id, 'image': self.upload()}
+        )
+        yield (
+            'post_edit', reverse('posts:post_edit', args=(post.id,)),
+            self.post_author, 'get', None
+        )
+        yield (
+            'post_edit', reverse('posts:post_edit', args=(post.id,)),
+            self.post_author, 'post',
+            {'text': 'Правка', 'group': other_group.id, 'image': self.upload()}
+        )
+        yield (
+            'add_comment', reverse('posts:add_comment', args=(post.id,)),
+            self.authorized_client, 'post', {'text': 'Новый'}
+        )
+        yield (
+            'export_data', reverse('posts:export_data'),
+            self.post_author, 'get', None
+        )
+        yield (
+            'profile_follow',
+            reverse('posts:profile_follow', args=(self.authors[-1],)),
+            self.authorized_client, 'get', None
+        )
+        # У знаменитости после отписки остаётся FEED_FANOUT_MAX_FOLLOWERS
+        # подписчиков: её посты снова раздаются фоновой задачей.
+        yield (
+            'profile_unfollow',
+            reverse('posts:profile_unfollow', args=(self.authors[0],)),
+            self.authorized_client, 'get', None
+        )
+
+    def cursors(self, response):
+        page = (
+            response.context.get('page_obj')
+            or response.context.get('comments')
+        )
+        links = [link.cursor for link in page.page_links]
+        if page.has_next():
+            links += [page.next_cursor, page.last_cursor]
+        if page.has_previous():
+            links.append(page.previous_cursor)
+        return {cursor for cursor in links if cursor}
+
+    def measure_cold(self, url, client, method='get', data=None):
+        """Замер на холодном кэше, откатываемый после запроса: каждый путь
+        меряется на одних и тех же данных."""
+        cache.clear()
+        with transaction.atomic():
+            response, usage = self.measure(url, client, method, data)
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 400, url)
+        return response, usage
+
+    def paths(self):
+        """Все пути запроса: каждая страница каждой выдачи, куда ведут
+        её ссылки, и остальные view. Вошедший читает сессию и себя
+        сверх того, что делает аноним, поэтому аноним открывает только
+        первую страницу: у него свои пути, например шапка профиля."""
+        for name, url, login_required in self.listings():
+            if not login_required:
+                yield name, self.measure_cold(url, self.client)[1]
+            seen, queue = set(), ['']
+            while queue:
+                cursor = queue.pop()
+                address = (
+                    f'{url}{"&" if "?" in url else "?"}cursor={cursor}'
+                    if cursor else url
+                )
+                response, usage = self.measure_cold(
+                    address, self.authorized_client
+                )
+                yield name, usage
+                for found in self.cursors(response) - seen:
+                    seen.add(found)
+                    queue.append(found)
+        for name, url, client, method, data in self.actions():
+            yield name, self.measure_cold(url, client, method, data)[1]
+
+    def worst(self):
+        """{view: (худшее число запросов, худшее число строк, число
+        пройденных путей)}."""
+        worst = defaultdict(lambda: (0, 0, 0))
+        for name, usage in self.paths():
+            queries, rows, paths = worst[name]
+            worst[name] = (
+                max(queries, usage.queries), max(rows, usage.rows), paths + 1
+            )
+        return worst
+
+    def budget(self, name):
+        pattern = next(
+            pattern for pattern in urlpatterns if pattern.name == name
+        )
+        return pattern.callback.query_budget
+
+    def test_every_view_declares_budget(self):
+        for pattern in urlpatterns:
+            with self.subTest(view=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_budgets_cover_worst_path(self):
+        # Бюджет равен худшему пути на холодном кэше, и он не зависит от
+        # объёма данных: запас сверх худшего пути скрыл бы N+1 при росте.
+        small = self.worst()
+        pages = -(-AUTHOR_POSTS // POSTS_SHOWN_AMOUNT)
+        self.assertGreater(small['profile'][2], pages)
+        self.assertGreater(
+            small['post_detail'][2], -(-COMMENTS // COMMENTS_SHOWN_AMOUNT)
+        )
+        self.grow()
+        large = self.worst()
+        self.assertEqual(
+            set(small), {pattern.name for pattern in urlpatterns}
+        )
+        for name, (queries, rows, _) in small.items():
+            budget = self.budget(name)
+            with self.subTest(view=name):
+                self.assertEqual(large[name][0], queries)
+                self.assertEqual(queries, budget.queries)
+                self.assertLessEqual(max(rows, large[name][1]), budget.rows)
@@ -0,0 +1,86 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)\b(?! USING)')
+TEMP_SORT = 'USE TEMP B-TREE'
+CHECKED_TABLES = (
+    'posts_post', 'posts_comment', 'posts_feedentry', 'posts_follow',
+)
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.bulk_create([
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(30)
+        ])
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.first()
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.reader, text=f'Комментарий {i}')
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def query_plans(self, url, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                if not any(table in sql for table in CHECKED_TABLES):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plans.append((sql, [row[-1] for row in cursor.fetchall()]))
+        return response, plans
+
+    def assertIndexedPlans(self, url, data=None):
+        response, plans = self.query_plans(url, data)
+        self.assertTrue(plans, f'{url} не выполнил ни одного запроса к постам')
+        for sql, plan in plans:
+            for step in plan:
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertNotIn(TEMP_SORT, step)
+                    match = FULL_SCAN.match(step)
+                    self.assertFalse(
+                        match and match.group('table') in CHECKED_TABLES,
+                        'Полный просмотр таблицы вместо индекса'
+                    )
+        return response
+
+    def test_feed_queries_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            response = self.assertIndexedPlans(url)
+            page_obj = response.context['page_obj']
+            self.assertIndexedPlans(url, {'cursor': page_obj.next_cursor})
+            self.assertIndexedPlans(url, {'cursor': page_obj.last_cursor})
+
+    def test_post_detail_queries_use_indexes(self):
+        self.assertIndexedPlans(
+            reverse('posts:post_detail', args=(self.post.id,))
+        )
@@ -0,0 +1,116 @@
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+from posts.search import SearchPaginator, filter_matching, rebuild_index
+from .fixtures import FixturesTestCase
+
+
+class SearchTests(FixturesTestCase):
+    def search(self, text, **kwargs):
+        return list(SearchPaginator(text, 10, **kwargs).page())
+
+    def test_results_are_ranked(self):
+        rare = Post.objects.create(
+            author=self.user, text='кошка кошка кошка спит на диване'
+        )
+        common = Post.objects.create(
+            author=self.user,
+            text='на диване лежит собака, рядом где-то кошка и много слов'
+        )
+        self.assertEqual(self.search('кошка'), [rare, common])
+        self.assertEqual(self.search('собака'), [common])
+        self.assertEqual(self.search('AND NEAR( *'), [])
+
+    def test_filters_by_group_and_author(self):
+        group = Group.objects.create(title='Кошки', slug='cats')
+        in_group = Post.objects.create(
+            author=self.user, group=group, text='кошка в группе'
+        )
+        Post.objects.create(
+            author=self.__class__.user, text='кошка без группы'
+        )
+        self.assertEqual(self.search('кошка', group=group), [in_group])
+        self.assertEqual(self.search('кошка', author=self.user), [in_group])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(author=self.user, text='первая версия')
+        self.assertEqual(self.search('первая'), [post])
+        post.text = 'вторая версия'
+        post.save()
+        self.assertEqual(self.search('первая'), [])
+        self.assertEqual(self.search('вторая'), [post])
+        post.delete()
+        self.assertEqual(self.search('вторая'), [])
+
+    def test_fixture_loading_leaves_index_to_rebuild(self):
+        post = Post(
+            author=self.user, text='загружен из фикстуры',
+            updated=timezone.now()
+        )
+        # Так сохраняет loaddata: без pre_save и с raw=True в сигналах.
+        post.save_base(raw=True)
+        self.assertEqual(self.search('фикстуры'), [])
+        rebuild_index()
+        self.assertEqual(self.search('фикстуры'), [post])
+
+    def test_pages_do_not_overlap(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'поиск страница {i}')
+            for i in range(5)
+        )
+        for post in Post.objects.filter(text__startswith='поиск'):
+            post.save()
+        paginator = SearchPaginator('поиск', 2)
+        shown = []
+        page = paginator.page()
+        while True:
+            shown.extend(post.id for post in page)
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(len(shown), 5)
+        self.assertEqual(len(set(shown)), 5)
+        previous = paginator.page(page.previous_cursor)
+        self.assertEqual([post.id for post in previous], shown[-3:-1])
+
+    def test_search_view(self):
+        Post.objects.create(author=self.user, text='уникальное слово')
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'уникальное'})
+        self.assertContains(response, 'уникальное слово')
+        response = self.client.get(
+            url, {'q': 'уникальное', 'group': 'test-slug'}
+        )
+        self.assertNotContains(response, 'уникальное слово')
+
+    def test_admin_uses_index(self):
+        Post.objects.create(author=self.user, text='админка ищет')
+        Post.objects.create(author=self.user, text='ищет и находит')
+        self.assertEqual(
+            filter_matching(Post.objects.all(), 'ищет').count(), 2
+        )
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ищет'}
+        )
+        self.assertContains(response, 'админка ищет')
+        self.assertContains(response, 'ищет и находит')
+
+    def test_filter_matching_returns_every_match(self):
+        matches = {
+            Post.objects.create(author=self.user, text=f'совпадение {i}')
+            for i in range(3)
+        }
+        Post.objects.create(author=self.user, text='мимо')
+        for indexed in (True, False):
+            with self.subTest(indexed=indexed), mock.patch(
+                'posts.search.fts_available', return_value=indexed
+            ):
+                self.assertEqual(
+                    set(filter_matching(Post.objects.all(), 'совпадение')),
+                    matches
+                )
@@ -0,0 +1,162 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from posts.middleware import THUMBNAIL_LOOKUPS_HEADER
+from posts.importing import rebuild_derived
+from posts.models import Post, Thumbnail
+from posts.views import POSTS_SHOWN_AMOUNT
+from posts.thumbnails import (cached_thumbnail, generate_post_thumbnails,
+                              posts_without_thumbnails, prefetch_thumbnails)
+from tasks.models import Task
+from .fixtures import FixturesTestCase
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(FixturesTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        with override_settings(TASKS_EAGER=False):
+            self.image_post = Post.objects.create(
+                author=self.user,
+                text='Пост с картинкой',
+                image=SimpleUploadedFile(
+                    name='small.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                )
+            )
+
+    def test_placeholder_until_thumbnails_exist(self):
+        url = reverse('posts:post_detail', args=(self.image_post.id,))
+        self.assertIsNone(cached_thumbnail(self.image_post.image, 'card'))
+        self.assertContains(self.authorized_client.get(url), 'bg-light')
+        self.assertTrue(
+            Task.objects.filter(name='posts.generate_thumbnails').exists()
+        )
+        call_command('process_tasks', once=True, workers=0, stdout=StringIO())
+        for size in settings.POST_THUMBNAILS:
+            with self.subTest(size=size):
+                self.assertIsNotNone(
+                    cached_thumbnail(self.image_post.image, size)
+                )
+        thumbnail = cached_thumbnail(self.image_post.image, 'detail')
+        self.assertContains(self.authorized_client.get(url), thumbnail.url)
+
+    def test_posts_saved_outside_views_get_thumbnails(self):
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост из админки',
+            image=SimpleUploadedFile(
+                name='admin.gif', content=SMALL_GIF, content_type='image/gif'
+            )
+        )
+        self.assertIsNotNone(cached_thumbnail(post.image, 'card'))
+        rebuild_derived(follows=False, stdout=StringIO())
+        self.assertIsNotNone(
+            cached_thumbnail(self.image_post.image, 'card')
+        )
+
+    def test_backfill_command(self):
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        self.assertIsNotNone(
+            cached_thumbnail(self.image_post.image, 'card')
+        )
+
+    def test_post_missing_one_size_needs_thumbnails(self):
+        self.assertIn(self.image_post.id, posts_without_thumbnails())
+        generate_post_thumbnails(self.image_post.id)
+        self.assertNotIn(self.image_post.id, posts_without_thumbnails())
+        Thumbnail.objects.filter(size='detail').delete()
+        self.assertIn(self.image_post.id, posts_without_thumbnails())
+
+    def test_feed_prefetches_thumbnails_in_one_lookup(self):
+        image_posts = [self.image_post] + [
+            Post.objects.create(
+                author=self.user,
+                text=f'Ещё пост с картинкой {i}',
+                image=SimpleUploadedFile(
+                    name=f'small{i}.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                )
+            )
+            for i in range(2)
+        ]
+        for post in image_posts:
+            generate_post_thumbnails(post.id)
+        thumbnails, round_trips = prefetch_thumbnails(
+            [post.image for post in image_posts], 'card'
+        )
+        self.assertEqual(round_trips, 1)
+        self.assertEqual(
+            {name: thumbnail.url for name, thumbnail in thumbnails.items()},
+            {
+                post.image.name: cached_thumbnail(post.image, 'card').url
+                for post in image_posts
+            }
+        )
+        response = self.authorized_client.get(reverse('posts:index'))
+        for thumbnail in thumbnails.values():
+            self.assertContains(response, thumbnail.url)
+        self.assertEqual(
+            response[THUMBNAIL_LOOKUPS_HEADER], str(len(image_posts) - 1)
+        )
+
+    @override_settings(SINGLE_PROCESS=True)
+    def test_profile_with_images_takes_two_queries(self):
+        # Несколько страниц картинок: миниатюры не добавляют запросов.
+        for i in range(2 * POSTS_SHOWN_AMOUNT + 5):
+            Post.objects.create(
+                author=self.user,
+                text=f'Пост профиля {i}',
+                image=SimpleUploadedFile(
+                    name=f'profile{i}.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                )
+            )
+        url = reverse('posts:profile', args=(self.user.username,))
+        cache.clear()
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.has_next())
+        thumbnails = Thumbnail.objects.filter(
+            source__in=[post.image.name for post in page_obj], size='card'
+        )
+        self.assertEqual(len(thumbnails), POSTS_SHOWN_AMOUNT)
+        for thumbnail in thumbnails:
+            self.assertContains(response, thumbnail.url)
+        with self.assertNumQueries(2):
+            self.client.get(url, {'cursor': page_obj.next_cursor})
+        # Главная прогревает сессию и пользователя в кэше.
+        self.authorized_client.get(reverse('posts:index'))
+        with self.assertNumQueries(2):
+            response = self.authorized_client.get(
+                url, {'cursor': page_obj.next_cursor}
+            )
+        self.assertEqual(len(response.context['page_obj']), POSTS_SHOWN_AMOUNT)
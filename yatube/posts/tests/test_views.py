@@ -120,24 +120,67 @@ class PostVeiwsTests(TestCase):
                        view_queryset=Post.objects.all(),
                        ):
         cache.clear()
-        response = self.authorized_client.get(
-            reverse(reverse_name, kwargs=reverse_kwargs)
-        )
+        url = reverse(reverse_name, kwargs=reverse_kwargs)
+        response = self.authorized_client.get(url)
+        page_obj = response.context[paginator_obj_name]
         self.assertEqual(
-            len(response.context[paginator_obj_name]),
+            len(page_obj),
             posts_number,
             'На страницу выводится неверное количество постов'
         )
-        last_page_number = (view_queryset.count() // posts_number) + 1
-        posts_number_on_last_page = view_queryset.count() % posts_number
+        self.assertFalse(page_obj.has_previous())
+        shown = list(page_obj)
+        while page_obj.has_next():
+            response = self.authorized_client.get(
+                url, {'cursor': page_obj.next_cursor}
+            )
+            page_obj = response.context[paginator_obj_name]
+            shown.extend(page_obj)
+        self.assertEqual(
+            shown,
+            list(view_queryset),
+            'Постраничный обход ленты пропускает или дублирует посты'
+        )
         response = self.authorized_client.get(
-            reverse(reverse_name, kwargs=reverse_kwargs)
-            + f'?page={last_page_number}'
+            url, {'cursor': page_obj.last_cursor}
+        )
+        last_page = response.context[paginator_obj_name]
+        # Пронумерованная последняя страница совпадает с последней
+        # страницей при листании вперёд, без номера — полная с конца.
+        self.assertEqual(
+            list(last_page),
+            list(page_obj) if last_page.number else shown[-posts_number:],
+            'На последнюю страницу выводятся не самые старые посты'
         )
+
+    def test_paginator_stable_when_new_posts_arrive(self):
+        url = reverse('posts:index')
+        response = self.authorized_client.get(url)
+        first_page = list(response.context[self.paginator_obj_name])
+        next_cursor = response.context[self.paginator_obj_name].next_cursor
+        Post.objects.create(author=self.user1, text='Новый пост')
+        response = self.authorized_client.get(url, {'cursor': next_cursor})
+        second_page = list(response.context[self.paginator_obj_name])
+        self.assertEqual(
+            first_page + second_page,
+            list(Post.objects.all()[1:POSTS_SHOWN_AMOUNT * 2 + 1])
+        )
+        previous_cursor = (
+            response.context[self.paginator_obj_name].previous_cursor
+        )
+        response = self.authorized_client.get(url, {'cursor': previous_cursor})
         self.assertEqual(
-            len(response.context[paginator_obj_name]),
-            posts_number_on_last_page,
-            'На последнюю страницу выводится неверное количество постов'
+            list(response.context[self.paginator_obj_name]),
+            first_page
+        )
+
+    def test_paginator_invalid_cursor_shows_first_page(self):
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(
+            list(response.context[self.paginator_obj_name]),
+            list(Post.objects.all()[:POSTS_SHOWN_AMOUNT])
         )
 
     def test_home_page_show_correct_context(self):
@@ -281,10 +324,7 @@ class PostVeiwsTests(TestCase):
 
     def test_cache(self):
         response1 = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.create(
-            author=self.user1,
-            text='Lorem ipsum dolor sit amet, consectetur adipiscing',
-        )
+        Post.objects.filter(id=self.post.id).update(text='Без сигналов')
         response2 = self.authorized_client.get(reverse('posts:index'))
         self.assertEqual(
             response1.content,
@@ -297,6 +337,28 @@ class PostVeiwsTests(TestCase):
             response3.content
         )
 
+    def test_cache_invalidated_by_changes(self):
+        feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group1.slug}),
+            reverse('posts:profile', kwargs={'username': self.user1.username}),
+        ]
+        for url in feeds:
+            self.authorized_client.get(url)
+        new_post = Post.objects.create(
+            author=self.user1,
+            group=self.group1,
+            text='Свежий пост для проверки кэша',
+        )
+        for url in feeds:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, new_post.text)
+        self.group1.title = 'Переименованная группа'
+        self.group1.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, self.group1.title)
+
     def test_follow(self):
         response = self.authorized_client.get(
             reverse(
@@ -351,7 +413,7 @@ class PostVeiwsTests(TestCase):
             'Посты автора не отображаются в избранных'
         )
         self.assertEqual(
-            response2.context['page_obj'].object_list.count(),
+            len(response2.context['page_obj'].object_list),
             0,
             'В избранных отображаются посты которых быть не должно'
         )
@@ -0,0 +1,119 @@
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import OuterRef, Q, Subquery
+from sorl.thumbnail import get_thumbnail
+
+from core.routers import reading_from_replica
+
+from .fragments import bump_post_versions
+from .models import Post, Thumbnail
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_KEY = 'thumbnail:{}:{}'
+# Отметка «миниатюры ещё нет»: без неё каждый промах шёл бы в базу.
+MISSING = ''
+
+
+def thumbnail_key(name, size):
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return THUMBNAIL_KEY.format(size, digest)
+
+
+def cached_thumbnail(image, size):
+    if not image:
+        return None
+    return prefetch_thumbnails([image], size)[0].get(image.name)
+
+
+def with_thumbnail_urls(posts, size):
+    """Выборка постов с адресом готовой миниатюры size в thumbnail_url
+    (None, если её ещё нет): миниатюры приходят тем же запросом, что и
+    страница, без отдельного обращения к кэшу и базе."""
+    return posts.annotate(thumbnail_url=Subquery(
+        Thumbnail.objects.filter(source=OuterRef('image'), size=size)
+        .values('url')[:1]
+    ))
+
+
+def prefetch_thumbnails(images, size):
+    """Находит готовые миниатюры сразу для всех картинок страницы: один
+    get_many к кэшу и один запрос к базе для промахов.
+    Возвращает {имя картинки: Thumbnail или None} и число обращений."""
+    keys = {
+        thumbnail_key(image.name, size): image.name
+        for image in images if image
+    }
+    if not keys:
+        return {}, 0
+    values = cache.get_many(keys)
+    round_trips = 1
+    missing = {keys[key] for key in keys if key not in values}
+    if missing:
+        found = {
+            thumbnail.source: thumbnail
+            for thumbnail in Thumbnail.objects.filter(
+                source__in=missing, size=size
+            )
+        }
+        fetched = {
+            thumbnail_key(name, size): found.get(name, MISSING)
+            for name in missing
+        }
+        if not reading_from_replica():
+            cache.set_many(fetched, settings.FEED_CACHE_TIMEOUT)
+        values.update(fetched)
+        round_trips += 1
+    return {
+        keys[key]: value or None for key, value in values.items()
+    }, round_trips
+
+
+def generate_thumbnails(image):
+    for size, (geometry, options) in settings.POST_THUMBNAILS.items():
+        thumbnail, _ = Thumbnail.objects.update_or_create(
+            source=image.name, size=size,
+            defaults={'url': get_thumbnail(image, geometry, **options).url},
+        )
+        cache.set(
+            thumbnail_key(image.name, size), thumbnail,
+            settings.FEED_CACHE_TIMEOUT
+        )
+
+
+def generate_post_thumbnails(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    if not post.image.storage.exists(post.image.name):
+        logger.info('Картинки поста %s нет в хранилище', post_id)
+        return
+    generate_thumbnails(post.image)
+    bump_post_versions(post)
+
+
+def posts_without_thumbnails():
+    """Посты, у картинки которых нет хотя бы одного размера из
+    POST_THUMBNAILS: после сбоя генерации или добавления размера."""
+    missing = Q()
+    for size in settings.POST_THUMBNAILS:
+        sources = Thumbnail.objects.filter(size=size).values('source')
+        missing |= ~Q(image__in=sources)
+    return (
+        Post.objects.exclude(image='')
+        .filter(missing)
+        .values_list('id', flat=True)
+    )
+
+
+def generate_in_worker(post_id):
+    try:
+        generate_post_thumbnails(post_id)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры поста %s', post_id)
+    finally:
+        connections.close_all()
@@ -1,72 +1,269 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db.models import Exists, OuterRef
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from core.budgets import query_budget
+from core.middleware import page_cache
+from core.paginators import CursorPaginator, cached_table_estimate
+from core.routers import read_from_replica, reading_from_replica
+from core.versions import get_versions
+from .exporting import export_rows, gzipped, jsonl
+from .feed import FollowFeedPaginator
+from .forms import CommentForm, PostForm, SearchForm
+from .fragments import (INDEX_SCOPES, follow_cache, group_cache, group_scopes,
+                        index_cache, post_scopes, profile_cache,
+                        profile_scopes)
+from .models import Comment, Follow, Group, Post, User
+from .search import search_paginator
+from .thumbnails import with_thumbnail_urls
 
 POSTS_SHOWN_AMOUNT = 10
+COMMENTS_SHOWN_AMOUNT = 20
+PROFILE_HEADER_KEY = 'profile-header:{}'
+# Бюджеты query_budget — худший путь на холодном кэше: чтение сессии и
+# пользователя, миниатюры картинок страницы, до двух запросов оценки
+# числа записей для номера последней страницы, постановка фоновых задач
+# (ключ задачи — проверка и вставка в точке сохранения). test_query_budgets
+# обходит все страницы каждой выдачи на данных двух объёмов и сверяет
+# бюджеты с худшим путём без запаса.
+# По строкам — пост, автор и группа на каждую строку выдачи: страница и
+# ещё PAGINATION_WINDOW страниц, из которых берутся ключи нумерованных
+# ссылок, плюс строка, по которой пагинатор узнаёт о следующей странице;
+# миниатюра на каждую карточку. Лента подписок сливает два источника и
+# читает вместе со страницей пропущенные курсором записи, у записи ленты
+# свой объект. Для комментариев — комментарий и автор, плюс пост с
+# автором, его счётчиками, группой и миниатюрой, сессия, зритель и
+# комментарий пустой формы.
+PAGE_FETCH = POSTS_SHOWN_AMOUNT * (settings.PAGINATION_WINDOW + 1) + 1
+PAGE_ROWS = 3 * PAGE_FETCH + POSTS_SHOWN_AMOUNT + 5
+FEED_ROWS = (
+    7 * (PAGE_FETCH + settings.PAGINATION_WINDOW * POSTS_SHOWN_AMOUNT)
+    + POSTS_SHOWN_AMOUNT + 5
+)
+COMMENT_ROWS = 2 * (COMMENTS_SHOWN_AMOUNT + 1) + 8
 
 
-def paginate(request, model_object, instances_amount: int):
-    paginator = Paginator(model_object, instances_amount)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def paginate(request, model_object, instances_amount: int, count=None,
+             windowed=True):
+    paginator = CursorPaginator(
+        model_object, instances_amount, count=count, windowed=windowed
+    )
+    cursor = request.GET.get('cursor')
+    page_obj = paginator.get_page(cursor)
     return page_obj
 
 
+def index_tags(request):
+    return INDEX_SCOPES
+
+
+@page_cache(index_tags)
+@query_budget(queries=6, rows=PAGE_ROWS)
+@read_from_replica
 def index(request):
     template = 'posts/index.html'
     posts = Post.objects.select_related('author', 'group')
-    page_obj = paginate(request, posts, POSTS_SHOWN_AMOUNT)
+    page_obj = paginate(
+        request, posts, POSTS_SHOWN_AMOUNT,
+        count=lambda: cached_table_estimate(Post)
+    )
+    feed_cache = index_cache()
     context = {
         'page_obj': page_obj,
+        'feed_cache': feed_cache,
     }
     return render(request, template, context)
 
 
+def group_tags(request, slug):
+    group_id = (
+        Group.objects.filter(slug=slug).values_list('id', flat=True).first()
+    )
+    return group_id and group_scopes(group_id)
+
+
+@page_cache(group_tags)
+@query_budget(queries=5, rows=PAGE_ROWS)
+@read_from_replica
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('author', 'group')
-    page_obj = paginate(request, posts, POSTS_SHOWN_AMOUNT)
+    page_obj = paginate(
+        request, posts, POSTS_SHOWN_AMOUNT, count=group.posts_count
+    )
+    feed_cache = group_cache(group)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_cache': feed_cache,
     }
     return render(request, template, context)
 
 
+def header_scopes(user_id):
+    return (f'author:{user_id}', f'followers:{user_id}', f'follower:{user_id}')
+
+
+def profile_header(request, username):
+    """Автор со счётчиками из UserStats для шапки профиля анонима. Запись
+    в кэше живёт, пока не сменились версии постов, данных и подписок
+    автора; промах — один запрос. Шапка запоминается в request: её
+    читают и теги page_cache, и сама view."""
+    header = getattr(request, 'profile_header', None)
+    if header is not None and header.username == username:
+        return header
+    key = PROFILE_HEADER_KEY.format(hashlib.md5(username.encode()).hexdigest())
+    entry = cache.get(key)
+    # Версии читаются до запроса: правка, пришедшая после него, оставит
+    # запись устаревшей. Без прошлой записи id автора, а значит и версии,
+    # неизвестны — такая запись только помнит id и сразу устаревает.
+    versions = get_versions(entry['versions']) if entry else None
+    if entry and entry['versions'] == versions:
+        header = entry['user']
+    else:
+        header = User.objects.select_related('stats').filter(
+            username=username
+        ).first()
+        if header is None:
+            return None
+        if not reading_from_replica():
+            cache.set(key, {
+                'versions': (
+                    versions if entry and entry['user'].id == header.id
+                    else dict.fromkeys(header_scopes(header.id))
+                ),
+                'user': header,
+            }, settings.FEED_CACHE_TIMEOUT)
+    request.profile_header = header
+    return header
+
+
+def profile_tags(request, username):
+    header = profile_header(request, username)
+    if header is None:
+        return None
+    return (*profile_scopes(header.id), *header_scopes(header.id)[1:])
+
+
+@page_cache(profile_tags)
+@query_budget(queries=4, rows=PAGE_ROWS)
+@read_from_replica
 def profile(request, username):
+    """Не больше двух запросов. Первый — шапка: автор со счётчиками из
+    UserStats, для вошедшего зрителя с подпиской через EXISTS; аноним
+    получает её из кэша profile_header. Второй — страница постов вместе
+    с ключами нумерованных ссылок и адресами миниатюр."""
     template = 'posts/profile.html'
-    profile_user = get_object_or_404(User, username=username)
-    posts = profile_user.posts.select_related('author', 'group')
-    page_obj = paginate(request, posts, POSTS_SHOWN_AMOUNT)
-    following = (
-        profile_user.following.filter(user_id=request.user.id).exists()
+    if request.user.is_authenticated:
+        profile_user = get_object_or_404(
+            User.objects.select_related('stats').annotate(
+                is_followed=Exists(Follow.objects.filter(
+                    user_id=request.user.id, author=OuterRef('pk')
+                ))
+            ),
+            username=username
+        )
+    else:
+        profile_user = profile_header(request, username)
+        if profile_user is None:
+            raise Http404
+        profile_user.is_followed = False
+    posts = with_thumbnail_urls(
+        profile_user.posts.select_related('author', 'group'), 'card'
     )
+    stats = getattr(profile_user, 'stats', None)
+    page_obj = paginate(
+        request, posts, POSTS_SHOWN_AMOUNT,
+        count=stats.posts_count if stats else None
+    )
+    feed_cache = profile_cache(profile_user)
     context = {
         'profile_user': profile_user,
         'page_obj': page_obj,
-        'following': following,
+        'following': profile_user.is_followed,
+        'feed_cache': feed_cache,
     }
     return render(request, template, context)
 
 
+def paginate_comments(request, post_id):
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        COMMENTS_SHOWN_AMOUNT,
+        ordering=('created', 'id'),
+        windowed=False
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def post_tags(request, post_id):
+    post = Post.objects.only('id', 'author_id', 'group_id').filter(
+        id=post_id
+    ).order_by().first()
+    return post and post_scopes(post)
+
+
+@page_cache(post_tags)
+@query_budget(queries=5, rows=COMMENT_ROWS)
+@read_from_replica
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
+        Post.objects.select_related('author__stats', 'group'),
         id=post_id
     )
     context = {
         'post': post,
         'form': CommentForm(),
-        'comments': post.comments.all(),
+        'comments': paginate_comments(request, post.id),
     }
     return render(request, template, context)
 
 
+def comments_tags(request, post_id):
+    return (f'post:{post_id}', 'users')
+
+
+@page_cache(comments_tags)
+@query_budget(queries=2, rows=COMMENT_ROWS)
+def post_comments(request, post_id):
+    template = 'includes/comments_list.html'
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {
+        'post': post,
+        'comments': paginate_comments(request, post.id),
+    }
+    return render(request, template, context)
+
+
+@query_budget(queries=6, rows=PAGE_ROWS + 5)
+def search(request):
+    template = 'posts/search.html'
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid():
+        paginator = search_paginator(
+            form.cleaned_data['q'],
+            POSTS_SHOWN_AMOUNT,
+            group=form.cleaned_data['group'],
+            author=form.cleaned_data['author'],
+        )
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    context = {
+        'form': form,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@query_budget(queries=17, rows=10)
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -84,6 +281,7 @@ def post_create(request):
     return render(request, template, context=context)
 
 
+@query_budget(queries=14, rows=10)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(
@@ -100,7 +298,10 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        # comments_count ведут сигналы: полная запись строки затёрла бы
+        # комментарии, добавленные, пока шло редактирование.
+        post.save(update_fields=(*PostForm.Meta.fields, 'updated'))
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -109,6 +310,7 @@ def post_edit(request, post_id):
     return render(request, template, context=context)
 
 
+@query_budget(queries=5, rows=10)
 @login_required
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
@@ -121,18 +323,22 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(queries=8, rows=FEED_ROWS)
 @login_required
+@read_from_replica
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = (Post.objects.filter(author__following__user=request.user)
-             .select_related('author', 'group'))
-    page_obj = paginate(request, posts, POSTS_SHOWN_AMOUNT)
+    paginator = FollowFeedPaginator(request.user, POSTS_SHOWN_AMOUNT)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     context = {
         'page_obj': page_obj,
+        'feed_cache': follow_cache(request.user),
     }
     return render(request, template, context)
 
 
+# Подписка сразу дописывает в ленту до FEED_BACKFILL_POSTS записей.
+@query_budget(queries=16, rows=settings.FEED_BACKFILL_POSTS + 10)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
@@ -145,10 +351,29 @@ def profile_follow(request, username):
     return redirect('posts:profile', username)
 
 
+@query_budget(queries=10, rows=5)
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(
-        user=request.user,
-        author=get_object_or_404(User, username=username)
-    ).delete()
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username)
+
+
+@query_budget(queries=6, rows=5)
+@login_required
+def export_data(request):
+    whole_site = request.GET.get('scope') == 'site'
+    if whole_site and not request.user.is_staff:
+        raise PermissionDenied
+    chunks = jsonl(export_rows(None if whole_site else request.user))
+    filename = 'yatube.jsonl' if whole_site else (
+        f'yatube-{request.user.username}.jsonl'
+    )
+    content_type = 'application/x-ndjson'
+    if request.GET.get('gzip'):
+        chunks = gzipped(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,19 @@
+from django.contrib import admin
+
+from core.paginators import EstimatedCountPaginator
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'attempts', 'run_at', 'duration', 'key'
+    )
+    list_filter = ('status',)
+    search_fields = ('name', 'key')
+    date_hierarchy = 'run_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .queue import task
+
+
+def message_data(message):
+    if message.attachments:
+        raise ValueError('Вложения в письмах из очереди не поддерживаются')
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    }
+
+
+@task(name='tasks.send_email')
+def send_email(data):
+    data = dict(data)
+    alternatives = data.pop('alternatives')
+    message = EmailMultiAlternatives(
+        connection=get_connection(settings.TASKS_EMAIL_BACKEND), **data
+    )
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    message.send()
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Кладёт письма в очередь задач; отправляет их воркер через
+    TASKS_EMAIL_BACKEND."""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            send_email.delay(message_data(message))
+        return len(email_messages)
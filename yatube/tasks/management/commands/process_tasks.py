@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks import queue
+
+POOLS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS_WORKERS,
+            help='Размер пула; 0 — выполнять в текущем потоке'
+        )
+        parser.add_argument(
+            '--pool', choices=sorted(POOLS), default='thread',
+            help='Потоки или процессы'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=100,
+            help='Сколько задач забирать из очереди за раз'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        pool = None
+        if options['workers'] > 0:
+            # Дочерние процессы не должны наследовать открытые соединения.
+            connections.close_all()
+            pool = POOLS[options['pool']](max_workers=options['workers'])
+        succeeded = failed = 0
+        try:
+            while True:
+                queue.requeue_stale()
+                task_ids = queue.claim(options['batch'])
+                if not task_ids:
+                    if options['once']:
+                        break
+                    time.sleep(settings.TASKS_POLL_INTERVAL)
+                    continue
+                if pool is None:
+                    results = map(queue.execute, task_ids)
+                else:
+                    results = pool.map(queue.execute_in_worker, task_ids)
+                for result in results:
+                    if result:
+                        succeeded += 1
+                    else:
+                        failed += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(
+            self.style.SUCCESS(f'Выполнено: {succeeded}, с ошибкой: {failed}')
+        )
+        for name, row in queue.stats().items():
+            self.stdout.write(
+                f'{name}: выполнено {row["done"]}, ошибок {row["failed"]}, '
+                f'в очереди {row["queued"]}, '
+                f'среднее {row["avg_duration"] or 0:.3f} с, '
+                f'максимум {row["max_duration"] or 0:.3f} с'
+            )
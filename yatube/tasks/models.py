@@ -0,0 +1,67 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(verbose_name='Задача', max_length=200)
+    payload = models.TextField(verbose_name='Аргументы', default='{}')
+    key = models.CharField(
+        verbose_name='Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True
+    )
+    status = models.CharField(
+        verbose_name='Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name='Попыток', default=0
+    )
+    max_attempts = models.PositiveIntegerField(
+        verbose_name='Максимум попыток', default=3
+    )
+    run_at = models.DateTimeField(
+        verbose_name='Запустить после', default=timezone.now
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата создания', auto_now_add=True
+    )
+    started = models.DateTimeField(
+        verbose_name='Начало выполнения', null=True, blank=True
+    )
+    finished = models.DateTimeField(
+        verbose_name='Конец выполнения', null=True, blank=True
+    )
+    duration = models.FloatField(
+        verbose_name='Длительность, с', null=True, blank=True
+    )
+    error = models.TextField(verbose_name='Последняя ошибка', blank=True)
+
+    class Meta:
+        ordering = ('run_at', 'id')
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        indexes = [
+            models.Index(
+                fields=('status', 'run_at', 'id'),
+                name='task_status_run_at_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,169 @@
+import json
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Avg, Count, F, Max, Q
+from django.utils import timezone
+
+from core.budgets import untracked
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, backoff):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<TaskFunction {self.name}>'
+
+    def delay(self, *args, key=None, **kwargs):
+        return enqueue(self.name, args, kwargs, key=key)
+
+
+def task(name=None, max_attempts=None, backoff=None):
+    """Регистрирует функцию как фоновую задачу. Аргументы задачи должны
+    сериализоваться в JSON."""
+    def decorator(func):
+        task_function = TaskFunction(
+            func,
+            name or f'{func.__module__}.{func.__name__}',
+            max_attempts or settings.TASKS_MAX_ATTEMPTS,
+            backoff if backoff is not None else settings.TASKS_BACKOFF,
+        )
+        REGISTRY[task_function.name] = task_function
+        return task_function
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, key=None):
+    task_function = REGISTRY[name]
+    kwargs = kwargs or {}
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs})
+    if settings.TASKS_EAGER:
+        run_eagerly(task_function, json.loads(payload))
+        return None
+    fields = {
+        'name': name,
+        'payload': payload,
+        'max_attempts': task_function.max_attempts,
+    }
+    if key is None:
+        return Task.objects.create(**fields)
+    # Повторная постановка с тем же ключом возвращает уже созданную задачу.
+    return Task.objects.get_or_create(key=key, defaults=fields)[0]
+
+
+def run_eagerly(task_function, payload):
+    started = time.monotonic()
+    with untracked():
+        task_function(*payload['args'], **payload['kwargs'])
+    logger.debug(
+        'Задача %s выполнена за %.3f с',
+        task_function.name, time.monotonic() - started
+    )
+
+
+def retry_delay(task_function, attempt):
+    return timedelta(seconds=task_function.backoff * 2 ** (attempt - 1))
+
+
+def requeue_stale():
+    """Задачи упавшего воркера возвращаются в очередь по таймауту, а
+    исчерпавшие попытки помечаются упавшими: иначе задача, которая роняет
+    воркер, выполнялась бы бесконечно. Возвращает число возвращённых."""
+    now = timezone.now()
+    stale = Task.objects.filter(
+        status=Task.RUNNING,
+        started__lt=now - timedelta(seconds=settings.TASKS_RUNNING_TIMEOUT)
+    )
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.FAILED, finished=now,
+        error='Воркер не завершил задачу за TASKS_RUNNING_TIMEOUT'
+    )
+    return stale.update(status=Task.QUEUED)
+
+
+def claim(limit):
+    """Забирает до limit готовых задач. Условный UPDATE по статусу не даёт
+    двум воркерам взять одну задачу и не требует SELECT FOR UPDATE."""
+    now = timezone.now()
+    candidates = (
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .order_by('run_at', 'id')
+        .values_list('pk', flat=True)[:limit]
+    )
+    return [
+        pk for pk in list(candidates)
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, started=now, attempts=F('attempts') + 1
+        )
+    ]
+
+
+def execute(task_id):
+    task_row = Task.objects.get(pk=task_id)
+    task_function = REGISTRY.get(task_row.name)
+    started = time.monotonic()
+    try:
+        if task_function is None:
+            raise LookupError(f'Задача {task_row.name} не зарегистрирована')
+        payload = json.loads(task_row.payload)
+        task_function(*payload['args'], **payload['kwargs'])
+    except Exception:
+        duration = time.monotonic() - started
+        error = traceback.format_exc()
+        logger.exception('Задача %s упала', task_row)
+        fields = {'duration': duration, 'error': error}
+        if task_function and task_row.attempts < task_row.max_attempts:
+            fields.update(
+                status=Task.QUEUED,
+                run_at=timezone.now()
+                + retry_delay(task_function, task_row.attempts),
+            )
+        else:
+            fields.update(status=Task.FAILED, finished=timezone.now())
+        Task.objects.filter(pk=task_id).update(**fields)
+        return False
+    Task.objects.filter(pk=task_id).update(
+        status=Task.DONE,
+        finished=timezone.now(),
+        duration=time.monotonic() - started,
+        error=''
+    )
+    return True
+
+
+def execute_in_worker(task_id):
+    try:
+        return execute(task_id)
+    finally:
+        connections.close_all()
+
+
+def stats():
+    """Сводка по задачам: число выполненных и упавших, среднее и
+    максимальное время выполнения."""
+    return {
+        row.pop('name'): row
+        for row in Task.objects.order_by('name').values('name').annotate(
+            done=Count('id', filter=Q(status=Task.DONE)),
+            failed=Count('id', filter=Q(status=Task.FAILED)),
+            queued=Count('id', filter=Q(status=Task.QUEUED)),
+            avg_duration=Avg('duration', filter=Q(status=Task.DONE)),
+            max_duration=Max('duration', filter=Q(status=Task.DONE)),
+        )
+    }
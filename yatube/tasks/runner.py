@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+from core.budgets import RAISE
+
+
+class EagerTasksTestRunner(DiscoverRunner):
+    """В тестах задачи выполняются сразу при постановке в очередь, как
+    Django подменяет почтовый бэкенд на locmem. Превышение query_budget
+    роняет запрос: нарушение, которое в продакшене только попало бы в
+    лог, валит тест, в котором случилось."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._tasks_eager = settings.TASKS_EAGER
+        self._query_budget_mode = settings.QUERY_BUDGET_MODE
+        settings.TASKS_EAGER = True
+        settings.QUERY_BUDGET_MODE = RAISE
+
+    def teardown_test_environment(self, **kwargs):
+        settings.TASKS_EAGER = self._tasks_eager
+        settings.QUERY_BUDGET_MODE = self._query_budget_mode
+        super().teardown_test_environment(**kwargs)
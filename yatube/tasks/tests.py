@@ -0,0 +1,112 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Task
+from .queue import claim, enqueue, execute, requeue_stale, task
+
+CALLS = []
+
+
+@task(name='tasks.tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@task(name='tasks.tests.broken', max_attempts=2, backoff=10)
+def broken():
+    raise RuntimeError('сломалось')
+
+
+@override_settings(TASKS_EAGER=False)
+class QueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_eager_mode_runs_immediately(self):
+        with self.settings(TASKS_EAGER=True):
+            self.assertIsNone(record.delay('сразу'))
+        self.assertEqual(CALLS, ['сразу'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_idempotency_key(self):
+        first = record.delay(1, key='record:1')
+        second = enqueue('tasks.tests.record', [1], key='record:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(CALLS, [])
+
+    def test_claimed_task_is_not_claimed_again(self):
+        queued = record.delay(1)
+        self.assertEqual(claim(10), [queued.pk])
+        self.assertEqual(claim(10), [])
+        self.assertTrue(execute(queued.pk))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.DONE)
+        self.assertIsNotNone(queued.duration)
+        self.assertEqual(CALLS, [1])
+
+    def test_retries_with_backoff(self):
+        queued = broken.delay()
+        before = timezone.now()
+        claim(10)
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            self.assertFalse(execute(queued.pk))
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertGreaterEqual(queued.run_at, before + timedelta(seconds=10))
+        self.assertIn('сломалось', queued.error)
+        self.assertEqual(claim(10), [])
+        Task.objects.update(run_at=timezone.now())
+        claim(10)
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            execute(queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertEqual(queued.attempts, 2)
+
+    @override_settings(TASKS_RUNNING_TIMEOUT=60)
+    def test_stale_task_fails_after_last_attempt(self):
+        queued = broken.delay()
+        for attempt in range(1, 3):
+            self.assertEqual(claim(10), [queued.pk])
+            Task.objects.update(
+                started=timezone.now() - timedelta(minutes=2)
+            )
+            requeue_stale()
+            queued.refresh_from_db()
+            self.assertEqual(queued.attempts, attempt)
+        self.assertEqual(queued.status, Task.FAILED)
+        self.assertIsNotNone(queued.finished)
+        self.assertEqual(claim(10), [])
+
+    def test_worker_command(self):
+        record.delay('из воркера')
+        output = StringIO()
+        call_command('process_tasks', once=True, workers=0, stdout=output)
+        self.assertEqual(CALLS, ['из воркера'])
+        self.assertIn('tasks.tests.record: выполнено 1', output.getvalue())
+
+    @override_settings(
+        EMAIL_BACKEND='tasks.mail.QueuedEmailBackend',
+        TASKS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+    )
+    def test_password_reset_mail_is_queued(self):
+        get_user_model().objects.create_user(
+            username='reset', email='reset@example.com', password='pass'
+        )
+        response = self.client.post(
+            reverse('users:password_reset'), {'email': 'reset@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertTrue(Task.objects.filter(name='tasks.send_email').exists())
+        call_command('process_tasks', once=True, workers=0, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reset@example.com'])
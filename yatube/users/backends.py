@@ -0,0 +1,14 @@
+from django.contrib.auth.backends import ModelBackend
+
+from core.routers import primary_reads
+from .caching import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя текущей сессии из кэша.
+    Кэш сбрасывается при сохранении пользователя и при выходе. Промах
+    читается с основной базы: на реплике блокировка могла ещё не дойти."""
+
+    def get_user(self, user_id):
+        with primary_reads():
+            return get_cached_user(user_id, super().get_user)
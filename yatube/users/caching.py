@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import is_shared
+
+USER_KEY = 'auth-user:{}'
+STATS_KEY = 'auth-cache:{}:{}'
+KINDS = ('sessions', 'users')
+
+
+def get_cached_user(user_id, load):
+    """Пользователь сессии из кэша. В кэше, локальном для процесса, он не
+    хранится: выход, смена пароля или блокировка сбросили бы запись только
+    в одном воркере, а остальные продолжали бы пускать пользователя."""
+    if not is_shared():
+        return load(user_id)
+    key = USER_KEY.format(user_id)
+    user = cache.get(key)
+    record('users', user is not None)
+    if user is None:
+        user = load(user_id)
+        if user is not None:
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget_user(user_id):
+    cache.delete(USER_KEY.format(user_id))
+
+
+def record(kind, hit):
+    key = STATS_KEY.format(kind, 'hits' if hit else 'misses')
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def hit_rates():
+    """{вид: (попадания, промахи, доля попаданий или None)}."""
+    keys = [
+        STATS_KEY.format(kind, outcome)
+        for kind in KINDS for outcome in ('hits', 'misses')
+    ]
+    values = cache.get_many(keys)
+    rates = {}
+    for kind in KINDS:
+        hits = values.get(STATS_KEY.format(kind, 'hits'), 0)
+        misses = values.get(STATS_KEY.format(kind, 'misses'), 0)
+        total = hits + misses
+        rates[kind] = (hits, misses, hits / total if total else None)
+    return rates
+
+
+def reset_stats():
+    cache.delete_many([
+        STATS_KEY.format(kind, outcome)
+        for kind in KINDS for outcome in ('hits', 'misses')
+    ])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from users.caching import hit_rates, reset_stats
+
+TITLES = {'sessions': 'Сессии', 'users': 'Пользователи'}
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю попаданий в кэш сессий и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', help='Обнулить счётчики'
+        )
+
+    def handle(self, *args, **options):
+        for kind, (hits, misses, rate) in hit_rates().items():
+            rate = f'{rate:.1%}' if rate is not None else '—'
+            self.stdout.write(
+                f'{TITLES[kind]}: попаданий {hits}, промахов {misses}, '
+                f'доля попаданий {rate}'
+            )
+        if options['reset']:
+            reset_stats()
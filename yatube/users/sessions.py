@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db, db
+
+from core.cache import is_shared
+from .caching import record
+
+
+class SessionStore(cached_db.SessionStore):
+    """cached_db, который считает попадания в кэш сессий. Если кэш
+    локален для процесса, сессия читается из базы: удалённая при выходе
+    в одном воркере, она осталась бы в кэше остальных."""
+
+    def load(self):
+        if not is_shared(settings.SESSION_CACHE_ALIAS):
+            return db.SessionStore.load(self)
+        self._loaded_from_db = False
+        data = super().load()
+        record('sessions', not self._loaded_from_db)
+        return data
+
+    def _get_session_from_db(self):
+        self._loaded_from_db = True
+        return super()._get_session_from_db()
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..caching import USER_KEY, reset_stats
+
+User = get_user_model()
+
+
+@override_settings(SINGLE_PROCESS=True)
+class AuthCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cached', password='old-Pa55word'
+        )
+        self.client.login(username='cached', password='old-Pa55word')
+        self.url = reverse('about:author')
+
+    def test_warm_requests_make_no_auth_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_user_edit_invalidates_cache(self):
+        self.client.get(self.url)
+        self.user.first_name = 'Новое'
+        self.user.save()
+        self.assertIsNone(cache.get(USER_KEY.format(self.user.pk)))
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['user'].first_name, 'Новое')
+
+    def test_password_change_logs_out_other_sessions(self):
+        other = Client()
+        other.login(username='cached', password='old-Pa55word')
+        other.get(self.url)
+        self.client.post(reverse('users:password_change'), {
+            'old_password': 'old-Pa55word',
+            'new_password1': 'new-Pa55word',
+            'new_password2': 'new-Pa55word',
+        })
+        self.assertTrue(
+            self.client.get(self.url).context['user'].is_authenticated
+        )
+        self.assertFalse(other.get(self.url).context['user'].is_authenticated)
+
+    def test_logout_forgets_user(self):
+        self.client.get(self.url)
+        self.client.get(reverse('users:logout'))
+        self.assertIsNone(cache.get(USER_KEY.format(self.user.pk)))
+        self.assertFalse(
+            self.client.get(self.url).context['user'].is_authenticated
+        )
+
+    def test_hit_rate_report(self):
+        reset_stats()
+        self.client.get(self.url)
+        self.client.get(self.url)
+        output = StringIO()
+        call_command('auth_cache_stats', stdout=output)
+        report = output.getvalue()
+        self.assertIn('Пользователи: попаданий 1, промахов 1', report)
+        self.assertIn('Сессии: попаданий 2, промахов 0', report)
+
+
+class LocalCacheAuthTests(TestCase):
+    """LocMem без SINGLE_PROCESS: кэш не общий, состояние входа берётся
+    из базы."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='local')
+        self.url = reverse('about:author')
+
+    def test_user_is_not_cached(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+        self.assertIsNone(cache.get(USER_KEY.format(self.user.pk)))
+        # Блокировка в обход сигналов, как из другого процесса.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertFalse(
+            self.client.get(self.url).context['user'].is_authenticated
+        )
+
+    def test_sessions_of_model_backend_stay_valid(self):
+        self.client.force_login(
+            self.user, backend='django.contrib.auth.backends.ModelBackend'
+        )
+        self.assertEqual(
+            self.client.get(self.url).context['user'], self.user
+        )
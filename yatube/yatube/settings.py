@@ -30,27 +30,35 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'tasks.apps.TasksConfig',
     'sorl.thumbnail',
-    'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryStickinessMiddleware',
+    'posts.middleware.ThumbnailLookupStatsMiddleware',
+    'core.middleware.AnonymousPageCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backend.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,9 +79,46 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': env.int('CONN_MAX_AGE', default=60),
+    }
+}
+
+# Реплики только для чтения: SQLITE_REPLICAS=/path/a.sqlite3,/path/b.sqlite3.
+# Локально это копии основной базы, которые обновляет sync_replicas.
+DATABASE_REPLICAS = []
+for number, path in enumerate(env.list('SQLITE_REPLICAS', default=[]), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': path,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = 10
+
+# Применяются к каждому новому соединению SQLite (core.db). WAL позволяет
+# читать во время записи, busy_timeout ждёт блокировку вместо ошибки.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
 }
 
+# Сессии и пользователь кэшируются, только если кэш общий (core.cache).
+# ModelBackend остаётся в списке: сессии хранят путь бэкенда, которым
+# вошли, и без него все старые сессии разлогинило бы.
+SESSION_ENGINE = 'users.sessions'
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = 60 * 60
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -108,7 +153,8 @@ else:
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -116,12 +162,56 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Версии фрагментов, кэш страниц и граф подписок должны быть видны всем
+# процессам: веб-воркерам и process_tasks. LocMem годится, только если
+# сайт и задачи (TASKS_EAGER) обслуживает один процесс — SINGLE_PROCESS;
+# иначе check --deploy требует общий кэш (core.checks).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': env.str(
+            'CACHE_BACKEND', default='core.cache.InstrumentedLocMemCache'
+        ),
+        'LOCATION': env.str('CACHE_LOCATION', default=''),
     }
 }
+SINGLE_PROCESS = env.bool('SINGLE_PROCESS', default=False)
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=INTERNAL_IPS)
+# Каждый процесс раз в METRICS_FLUSH_INTERVAL секунд пишет свои метрики в
+# METRICS_DIR/<pid>.json, /metrics суммирует файлы всех процессов. Без
+# каталога метрики видны только процессу, который отвечает на /metrics.
+METRICS_DIR = env.str('METRICS_DIR', default='')
+METRICS_FLUSH_INTERVAL = 1
+
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_BACKFILL_POSTS = 200
+FOLLOW_GRAPH_TIMEOUT = 60 * 60 * 24
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+POST_THUMBNAILS = {
+    'card': ('960x480', {'crop': 'top', 'upscale': True}),
+    'detail': ('1920x1080', {'crop': 'top', 'upscale': True}),
+}
+POST_THUMBNAIL_WORKERS = 2
+
+ESTIMATED_COUNT_LIMIT = 10000
+ESTIMATED_COUNT_TIMEOUT = 60 * 5
+PAGINATION_WINDOW = 2
+
+# off, log или raise: что делать, если view превысила свой query_budget.
+QUERY_BUDGET_MODE = env.str('QUERY_BUDGET_MODE', default='log')
+
+EXPORT_CHUNK_SIZE = 2000
+
+TEST_RUNNER = 'tasks.runner.EagerTasksTestRunner'
+TASKS_EAGER = env.bool('TASKS_EAGER', default=False)
+TASKS_WORKERS = 2
+TASKS_MAX_ATTEMPTS = 3
+TASKS_BACKOFF = 30
+TASKS_POLL_INTERVAL = 1
+TASKS_RUNNING_TIMEOUT = 60 * 10